@@ -0,0 +1,37 @@
+"""add id to the posts (user_id, created_at) index
+
+Revision ID: 2a7c5e9d4b18
+Revises: f3a6d2c9b814
+Create Date: 2026-10-18 20:14:37.215904
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2a7c5e9d4b18"
+down_revision: Union[str, Sequence[str], None] = "f3a6d2c9b814"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Author pages order and seek on (created_at, id).
+    op.drop_index("ix_posts_user_created", table_name="posts")
+    op.create_index(
+        "ix_posts_user_created",
+        "posts",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_posts_user_created", table_name="posts")
+    op.create_index(
+        "ix_posts_user_created", "posts", ["user_id", "created_at"], unique=False
+    )
@@ -0,0 +1,27 @@
+"""add posts (created_at, id) index for keyset pagination
+
+Revision ID: 3f9a1c2d7b40
+Revises: 05156ce6ebf6
+Create Date: 2026-10-18 10:12:04.118342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9a1c2d7b40"
+down_revision: Union[str, Sequence[str], None] = "05156ce6ebf6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_posts_created_id", "posts", ["created_at", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_posts_created_id", table_name="posts")
@@ -0,0 +1,32 @@
+"""add post_tags (tag_id, post_id) index
+
+Revision ID: 4d7e9b2a6c31
+Revises: 9e0b3d7a4f16
+Create Date: 2026-10-18 16:02:41.318270
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4d7e9b2a6c31"
+down_revision: Union[str, Sequence[str], None] = "9e0b3d7a4f16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_post_tags_tag_post",
+        "post_tags",
+        ["tag_id", "post_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_tags_tag_post", table_name="post_tags")
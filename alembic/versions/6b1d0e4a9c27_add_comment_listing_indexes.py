@@ -0,0 +1,51 @@
+"""add comment listing indexes
+
+Revision ID: 6b1d0e4a9c27
+Revises: d2c8e61f0a95
+Create Date: 2026-10-18 12:31:50.640218
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6b1d0e4a9c27"
+down_revision: Union[str, Sequence[str], None] = "d2c8e61f0a95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Listings order and seek on the sort key plus id, so every index ends in id.
+    op.create_index(
+        "ix_comments_post_likes",
+        "comments",
+        ["post_id", "likes_count", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_comments_user_created",
+        "comments",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index("ix_comments_post_created", table_name="comments")
+    op.create_index(
+        "ix_comments_post_created",
+        "comments",
+        ["post_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comments_post_created", table_name="comments")
+    op.create_index(
+        "ix_comments_post_created", "comments", ["post_id", "created_at"], unique=False
+    )
+    op.drop_index("ix_comments_user_created", table_name="comments")
+    op.drop_index("ix_comments_post_likes", table_name="comments")
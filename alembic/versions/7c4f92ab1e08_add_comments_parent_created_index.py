@@ -0,0 +1,32 @@
+"""add comments (parent_id, created_at, id) index
+
+Revision ID: 7c4f92ab1e08
+Revises: e8a35f7c2b61
+Create Date: 2026-10-18 13:47:09.772514
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c4f92ab1e08"
+down_revision: Union[str, Sequence[str], None] = "e8a35f7c2b61"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_comments_parent_created",
+        "comments",
+        ["parent_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comments_parent_created", table_name="comments")
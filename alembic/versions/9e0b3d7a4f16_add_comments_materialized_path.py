@@ -0,0 +1,63 @@
+"""add materialized path and depth to comments
+
+Revision ID: 9e0b3d7a4f16
+Revises: 7c4f92ab1e08
+Create Date: 2026-10-18 14:36:41.205873
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e0b3d7a4f16"
+down_revision: Union[str, Sequence[str], None] = "7c4f92ab1e08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay in sync with src.posts.repository._path_segment
+SEGMENT = (
+    "lpad(to_hex((extract(epoch FROM {t}.created_at) * 1000000)::bigint), 14, '0')"
+    " || replace({t}.id::text, '-', '')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "comments", sa.Column("path", sa.String(collation="C"), nullable=True)
+    )
+    op.add_column(
+        "comments",
+        sa.Column("depth", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        f"""
+        WITH RECURSIVE tree AS (
+            SELECT c.id, {SEGMENT.format(t="c")} AS path, 0 AS depth
+            FROM comments c
+            WHERE c.parent_id IS NULL
+            UNION ALL
+            SELECT c.id, tree.path || '/' || {SEGMENT.format(t="c")}, tree.depth + 1
+            FROM comments c
+            JOIN tree ON c.parent_id = tree.id
+        )
+        UPDATE comments
+        SET path = tree.path, depth = tree.depth
+        FROM tree
+        WHERE comments.id = tree.id
+        """
+    )
+    op.alter_column("comments", "path", nullable=False)
+    op.alter_column("comments", "depth", server_default=None)
+    op.create_index("ix_comments_path", "comments", ["path"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comments_path", table_name="comments")
+    op.drop_column("comments", "depth")
+    op.drop_column("comments", "path")
@@ -0,0 +1,48 @@
+"""add likes_count and comments_count columns to posts
+
+Revision ID: a47e2b9c5d13
+Revises: 3f9a1c2d7b40
+Create Date: 2026-10-18 11:02:37.504129
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a47e2b9c5d13"
+down_revision: Union[str, Sequence[str], None] = "3f9a1c2d7b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "posts",
+        sa.Column("likes_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "posts",
+        sa.Column("comments_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE posts SET
+            likes_count = (
+                SELECT count(*) FROM post_likes WHERE post_likes.post_id = posts.id
+            ),
+            comments_count = (
+                SELECT count(*) FROM comments WHERE comments.post_id = posts.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("posts", "comments_count")
+    op.drop_column("posts", "likes_count")
@@ -0,0 +1,50 @@
+"""add likes_count and replies_count columns to comments
+
+Revision ID: d2c8e61f0a95
+Revises: a47e2b9c5d13
+Create Date: 2026-10-18 11:48:15.927461
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d2c8e61f0a95"
+down_revision: Union[str, Sequence[str], None] = "a47e2b9c5d13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "comments",
+        sa.Column("likes_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "comments",
+        sa.Column("replies_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE comments SET
+            likes_count = (
+                SELECT count(*) FROM comment_likes
+                WHERE comment_likes.comment_id = comments.id
+            ),
+            replies_count = (
+                SELECT count(*) FROM comments AS replies
+                WHERE replies.parent_id = comments.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("comments", "replies_count")
+    op.drop_column("comments", "likes_count")
@@ -0,0 +1,35 @@
+"""add partial index for top-level comments of a post
+
+Revision ID: e8a35f7c2b61
+Revises: 6b1d0e4a9c27
+Create Date: 2026-10-18 13:05:22.318906
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e8a35f7c2b61"
+down_revision: Union[str, Sequence[str], None] = "6b1d0e4a9c27"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_comments_post_roots",
+        "comments",
+        ["post_id", "created_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("parent_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comments_post_roots", table_name="comments")
@@ -0,0 +1,46 @@
+"""add likes (target, created_at, id) indexes
+
+Revision ID: f3a6d2c9b814
+Revises: b5f1c8e3a274
+Create Date: 2026-10-18 18:47:12.504391
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a6d2c9b814"
+down_revision: Union[str, Sequence[str], None] = "b5f1c8e3a274"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The new indexes lead with the same column, so they replace the old ones.
+    op.create_index(
+        "ix_post_likes_post_created",
+        "post_likes",
+        ["post_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index("ix_post_likes_post_id", table_name="post_likes")
+    op.create_index(
+        "ix_comment_likes_comment_created",
+        "comment_likes",
+        ["comment_id", "created_at", "id"],
+        unique=False,
+    )
+    op.drop_index("ix_comment_likes_comment_id", table_name="comment_likes")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        "ix_comment_likes_comment_id", "comment_likes", ["comment_id"], unique=False
+    )
+    op.drop_index("ix_comment_likes_comment_created", table_name="comment_likes")
+    op.create_index("ix_post_likes_post_id", "post_likes", ["post_id"], unique=False)
+    op.drop_index("ix_post_likes_post_created", table_name="post_likes")
@@ -0,0 +1,170 @@
+"""Cost of the cache codecs on real post payloads.
+
+Builds a single `PostResponse`, a feed page of them and a `PostComments`
+window, then times encoding and decoding them with every serializer and
+compressor in `src.core.codec` that is installed, next to the previous
+zlib + json.dumps format. With --redis, each encoding is also stored and
+its `MEMORY USAGE` reported; the benchmark keys are removed afterwards.
+
+    python -m benchmarks.bench_cache_codec [--page-size 20] [--redis]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+from datetime import UTC, datetime, timedelta
+from itertools import product
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from src.core import codec
+from src.posts.schemas import PostComments, PostResponse
+
+KEY_PREFIX = "bench:codec"
+WORDS = ["cache", "redis", "postgres", "latency", "query", "index", "page", "post"]
+
+
+def make_author(rng: random.Random, i: int) -> dict:
+    return {
+        "id": UUID(int=rng.getrandbits(128)),
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "image_file": None,
+        "image_path": "/static/profile_pics/default.jpg",
+    }
+
+
+def make_post(rng: random.Random, i: int) -> dict:
+    created = datetime(2026, 1, 1, tzinfo=UTC) + timedelta(minutes=i)
+    author = make_author(rng, i % 50)
+    return {
+        "id": UUID(int=rng.getrandbits(128)),
+        "user_id": author["id"],
+        "author": author,
+        "title": f"Post number {i}",
+        "content": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(40, 250))),
+        "created_at": created,
+        "updated_at": created,
+        "likes_count": rng.randrange(1000),
+        "comments_count": rng.randrange(100),
+        "is_liked": rng.random() < 0.3,
+    }
+
+
+def make_payloads(page_size: int, seed: int = 0) -> dict[str, object]:
+    rng = random.Random(seed)
+    posts = [
+        PostResponse.model_validate(make_post(rng, i)).model_dump(mode="json")
+        for i in range(page_size)
+    ]
+    post = make_post(rng, 0)
+    comments = []
+    for i in range(page_size):
+        author = make_author(rng, i)
+        created = post["created_at"] + timedelta(seconds=i)
+        comments.append(
+            {
+                "id": UUID(int=rng.getrandbits(128)),
+                "user_id": author["id"],
+                "post_id": post["id"],
+                "parent_id": None,
+                "author": author,
+                "content": " ".join(rng.choice(WORDS) for _ in range(30)),
+                "created_at": created,
+                "updated_at": created,
+                "likes_count": rng.randrange(100),
+                "replies_count": rng.randrange(10),
+            }
+        )
+    post_comments = PostComments.model_validate(
+        {**post, "comments": comments, "next_cursor": "WyIyMDI2LTAxLTAxIl0"}
+    ).model_dump(mode="json")
+    return {
+        "post": posts[0],
+        "feed page": {"items": posts, "next_cursor": "WyIyMDI2LTAxLTAxIl0"},
+        "post+comments": post_comments,
+    }
+
+
+def legacy_encode(value) -> bytes:
+    return zlib.compress(json.dumps(value).encode())
+
+
+def legacy_decode(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+def available(compressor: str, serializer: str) -> bool:
+    try:
+        codec.Codec(serializer, compressor)
+    except RuntimeError:
+        return False
+    return True
+
+
+def timed(fn, arg, repeat: int) -> tuple[float, object]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(arg)
+    return (time.perf_counter() - start) / repeat, result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--min-size", type=int, default=512)
+    parser.add_argument("--redis", action="store_true")
+    parser.add_argument("--redis-host", default="localhost")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    redis = None
+    if args.redis:
+        redis = Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db)
+
+    print(f"json encoder: {'orjson' if codec.orjson is not None else 'json'}")
+    header = f"{'payload':>14} {'codec':>14} {'enc us':>8} {'dec us':>8} {'bytes':>8}"
+    print(header + (f" {'redis B':>8}" if redis else ""))
+    try:
+        for name, value in make_payloads(args.page_size).items():
+            runs = [("zlib6+json", legacy_encode, legacy_decode)]
+            for serializer, compressor in product(codec.SERIALIZERS, codec.COMPRESSORS):
+                if not available(compressor, serializer):
+                    continue
+                instance = codec.Codec(serializer, compressor, args.min_size)
+                runs.append(
+                    (
+                        f"{compressor}+{serializer}",
+                        lambda v, c=instance: c.encode(v)[0],
+                        lambda d, c=instance: c.decode(d)[0],
+                    )
+                )
+            for label, encode, decode in runs:
+                encode_time, data = timed(encode, value, args.repeat)
+                decode_time, decoded = timed(decode, data, args.repeat)
+                assert decoded == value, label
+                line = (
+                    f"{name:>14} {label:>14} {encode_time * 1e6:>8.1f} "
+                    f"{decode_time * 1e6:>8.1f} {len(data):>8}"
+                )
+                if redis:
+                    key = f"{KEY_PREFIX}:{name}:{label}"
+                    await redis.set(key, data)
+                    line += f" {await redis.memory_usage(key):>8}"
+                print(line)
+    finally:
+        if redis:
+            keys = [key async for key in redis.scan_iter(f"{KEY_PREFIX}:*")]
+            if keys:
+                await redis.delete(*keys)
+            await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""Throughput of comment-tree assembly + JSON encoding.
+
+Compares the previous approach (one `CommentWithChildren.model_validate` per
+node, then `model_dump` + `json.dumps` for the cache) with the single-pass
+row-tuple builder in `src.posts.tree`.
+
+    python -m benchmarks.bench_comment_tree [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import namedtuple
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from uuid import UUID
+
+from src.posts import tree
+from src.posts.schemas import CommentWithChildren
+
+Row = namedtuple(
+    "Row",
+    "id user_id post_id parent_id content created_at updated_at "
+    "likes_count replies_count username email image_file",
+)
+
+MAX_DEPTH = 10
+
+
+def make_rows(size: int, seed: int = 0) -> list[Row]:
+    rng = random.Random(seed)
+    base = datetime(2026, 1, 1, tzinfo=UTC)
+    post_id = UUID(int=rng.getrandbits(128))
+    authors = [
+        (UUID(int=rng.getrandbits(128)), f"user{i}", f"user{i}@example.com")
+        for i in range(500)
+    ]
+    ids = [UUID(int=rng.getrandbits(128)) for _ in range(size)]
+    parents: list[int | None] = [None]
+    depth = [0]
+    for i in range(1, size):
+        parent = rng.randrange(max(0, i - 50), i)
+        if depth[parent] >= MAX_DEPTH:
+            parent = 0
+        parents.append(parent)
+        depth.append(depth[parent] + 1)
+
+    replies = [0] * size
+    for parent in parents[1:]:
+        replies[parent] += 1
+
+    rows = []
+    for i in range(size):
+        user_id, username, email = authors[i % len(authors)]
+        created = base + timedelta(seconds=i)
+        rows.append(
+            Row(
+                id=ids[i],
+                user_id=user_id,
+                post_id=post_id,
+                parent_id=ids[parents[i]] if parents[i] is not None else None,
+                content=f"comment {i} " + "lorem ipsum " * 8,
+                created_at=created,
+                updated_at=created,
+                likes_count=rng.randrange(100),
+                replies_count=replies[i],
+                username=username,
+                email=email,
+                image_file=None,
+            )
+        )
+    # The repository returns parents before children, level by level.
+    order = sorted(range(size), key=lambda i: depth[i])
+    return [rows[i] for i in order]
+
+
+def legacy(rows: list[Row]) -> bytes:
+    nodes: dict[UUID, CommentWithChildren] = {}
+    for row in rows:
+        author = SimpleNamespace(
+            username=row.username,
+            email=row.email,
+            id=row.user_id,
+            image_file=row.image_file,
+            image_path="/static/profile_pics/default.jpg",
+        )
+        comment = SimpleNamespace(**row._asdict(), author=author)
+        nodes[row.id] = CommentWithChildren.model_validate(comment)
+
+    root = None
+    for node in nodes.values():
+        if node.id == rows[0].id:
+            root = node
+        elif node.parent_id in nodes:
+            nodes[node.parent_id].children.append(node)
+    return json.dumps(root.model_dump(mode="json")).encode()
+
+
+def single_pass(rows: list[Row]) -> bytes:
+    return tree.dumps(tree.build_comment_tree(rows, rows[0].id))
+
+
+def bench(fn, rows: list[Row]) -> tuple[float, int]:
+    start = time.perf_counter()
+    payload = fn(rows)
+    return time.perf_counter() - start, len(payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=100_000,
+        help="skip the per-node Pydantic path above this many nodes",
+    )
+    args = parser.parse_args()
+
+    encoder = "orjson" if tree.orjson is not None else "json"
+    print(f"encoder: {encoder}")
+    print(f"{'nodes':>10} {'approach':>12} {'seconds':>9} {'nodes/s':>12} {'MB':>8}")
+    for size in args.sizes:
+        rows = make_rows(size)
+        runs = [("single-pass", single_pass)]
+        if size <= args.legacy_max:
+            runs.insert(0, ("pydantic", legacy))
+        for name, fn in runs:
+            elapsed, nbytes = bench(fn, rows)
+            print(
+                f"{size:>10} {name:>12} {elapsed:>9.3f} "
+                f"{size / elapsed:>12,.0f} {nbytes / 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Cost of reading the hot feed: aggregate on read vs the Redis sorted set.
+
+Generates synthetic likes and comments over a week and compares computing
+the time-decayed top N from every interaction (what a per-request aggregate
+query has to do) with reading it from the ZSET kept by `src.posts.hot`.
+Also measures bump throughput through the Lua script. Needs a Redis server;
+the benchmark keys are removed afterwards.
+
+    python -m benchmarks.bench_hot_posts [--interactions 1000000 5000000]
+"""
+
+import argparse
+import asyncio
+import heapq
+import random
+import time
+from collections import defaultdict
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from src.posts import hot
+
+TOP_N = 20
+
+
+def make_interactions(size: int, posts: int, now: float, seed: int = 0):
+    # Popularity is heavy-tailed, like real traffic.
+    rng = random.Random(seed)
+    post_ids = [UUID(int=rng.getrandbits(128)) for _ in range(posts)]
+    interactions = []
+    for _ in range(size):
+        post_id = post_ids[min(int(rng.paretovariate(1.2)) - 1, posts - 1)]
+        weight = hot.COMMENT_WEIGHT if rng.random() < 0.2 else hot.LIKE_WEIGHT
+        created_at = now - rng.random() * hot.REBUILD_WINDOW
+        interactions.append((post_id, weight, created_at))
+    return interactions
+
+
+def aggregate(interactions, epoch: float) -> list[UUID]:
+    scores = defaultdict(float)
+    for post_id, weight, created_at in interactions:
+        scores[post_id] += weight * 2 ** ((created_at - epoch) / hot.HALF_LIFE)
+    return [p for p, _ in heapq.nlargest(TOP_N, scores.items(), key=lambda i: i[1])]
+
+
+async def bench_redis(redis: Redis, interactions, epoch: float, bumps: int) -> None:
+    store = hot.HotPosts(redis)
+    scores = defaultdict(float)
+    for post_id, weight, created_at in interactions:
+        scores[post_id] += weight * 2 ** ((created_at - epoch) / hot.HALF_LIFE)
+    ranked = heapq.nlargest(hot.MAX_HOT_POSTS, scores.items(), key=lambda i: i[1])
+
+    start = time.perf_counter()
+    await store.rebuild(ranked, epoch)
+    print(f"  rebuild ({len(ranked):,} posts) {time.perf_counter() - start:9.3f} s")
+
+    reads = 1000
+    start = time.perf_counter()
+    for _ in range(reads):
+        await store.top(TOP_N)
+    elapsed = time.perf_counter() - start
+    print(f"  zset top {TOP_N}          {elapsed / reads * 1e6:9.0f} us/read")
+
+    sample = random.Random(1).sample(interactions, min(bumps, len(interactions)))
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(store.bump(post_id, weight) for post_id, weight, _ in sample)
+    )
+    elapsed = time.perf_counter() - start
+    print(f"  bumps                {len(sample) / elapsed:9,.0f} /s")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--interactions", type=int, nargs="+", default=[1_000_000, 5_000_000]
+    )
+    parser.add_argument("--posts", type=int, default=200_000)
+    parser.add_argument("--bumps", type=int, default=20_000)
+    parser.add_argument("--redis-host", default="localhost")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--redis-db", type=int, default=15)
+    args = parser.parse_args()
+
+    redis = Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db)
+    now = time.time()
+    try:
+        for size in args.interactions:
+            interactions = make_interactions(size, args.posts, now)
+            print(f"{size:,} interactions over {args.posts:,} posts")
+
+            start = time.perf_counter()
+            aggregate(interactions, now)
+            elapsed = time.perf_counter() - start
+            print(f"  aggregate on read    {elapsed * 1e6:9.0f} us/read")
+
+            await bench_redis(redis, interactions, now, args.bumps)
+    finally:
+        await redis.delete(hot.HOT_KEY, hot.EPOCH_KEY)
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -18,6 +19,26 @@ class Settings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
 
+    # Buffer likes in Redis and flush them to Postgres in the background.
+    LIKES_WRITE_BEHIND: bool = False
+    # Coalesce concurrent like writes into multi-row statements.
+    LIKES_MICRO_BATCH: bool = False
+
+    # Per-process LRU in front of Redis for @cache, kept coherent across
+    # workers over pub/sub. Sizes are in bytes of encoded JSON.
+    CACHE_L1_ENABLED: bool = False
+    CACHE_L1_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_L1_TTL: int = 30
+    # e.g. CACHE_L1_NAMESPACE_MAX_BYTES='{"post": 16777216}'
+    CACHE_L1_NAMESPACE_MAX_BYTES: dict[str, int] = {}
+    # msgpack, lz4 and zstd need the fast-cache extra. Values smaller than
+    # CACHE_COMPRESS_MIN_BYTES are stored uncompressed. zstd encodes several
+    # times faster than zlib at about the same size; lz4 is faster still but
+    # takes over twice the Redis memory per entry.
+    CACHE_SERIALIZER: Literal["json", "msgpack"] = "json"
+    CACHE_COMPRESSION: Literal["none", "zlib", "lz4", "zstd"] = "zlib"
+    CACHE_COMPRESS_MIN_BYTES: int = 512
+
     @property
     def DATABASE_URL(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
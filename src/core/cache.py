@@ -1,15 +1,20 @@
+import asyncio
 import hashlib
 import json
 import random
-import zlib
+import time
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
+from fastapi import HTTPException, Response
 from fastapi.encoders import jsonable_encoder
 from redis.asyncio import ConnectionPool, Redis, RedisError
 
 from src.conf import settings
+from src.core.codec import codec, dumps_json, stamp, unstamp
+from src.core.local_cache import MISSING, LocalCache
 from src.core.logging_conf import logger
+from src.core.metrics import metrics
 
 
 class RedisManager:
@@ -50,6 +55,20 @@ def get_redis() -> Redis:
 
 
 PREFIX = "cache"
+INVALIDATION_CHANNEL = f"{PREFIX}:invalidate"
+
+# How long one request holds the right to refresh a stale entry.
+REFRESH_CLAIM_TTL = 10
+
+local_cache = (
+    LocalCache(
+        max_bytes=settings.CACHE_L1_MAX_BYTES,
+        ttl=settings.CACHE_L1_TTL,
+        namespace_max_bytes=settings.CACHE_L1_NAMESPACE_MAX_BYTES,
+    )
+    if settings.CACHE_L1_ENABLED
+    else None
+)
 
 
 def _build_stable_key(
@@ -83,50 +102,126 @@ def cache(
     namespace: str = "default",
     key_params: list[str] | None = None,
     response_model=None,
+    raw: bool = False,
+    stale: int = 0,
+    stale_if_error: bool = False,
+    tags: Callable[[Any, dict], Iterable[str]] | None = None,
 ):
+    """Cache the decorated endpoint's result in Redis.
+
+    With `raw=True` the entry holds the final JSON body and every call is
+    answered with a `Response` of it, so hits skip the decode, validate and
+    encode FastAPI would otherwise do. An endpoint may return a pre-encoded
+    `Response` itself; any other result is validated against
+    `response_model` once, when it is computed. Don't use it for results
+    the caller still reads or amends.
+
+    With `stale` the entry is kept that many seconds past `exp`. The first
+    request after `exp` recomputes it while everyone else is served the
+    stale value without waiting. With `stale_if_error` too, a failed
+    recompute serves the stale value instead of raising.
+
+    `tags(result, kwargs)` names what the entry depends on, e.g.
+    `post:{id}`; `invalidate_tags` drops every entry that named a tag.
+    """
+
     def decorator(func):
+        async def store(redis: Redis, key: str, response: Any, kwargs: dict) -> Any:
+            jittered_exp = exp + random.randint(0, exp // 10)
+            value, data, size = _encode(response, response_model, raw)
+            metrics.observe("cache_payload_bytes", size, namespace=namespace)
+            async with redis.pipeline(transaction=False) as pipe:
+                await _queue_write(
+                    pipe,
+                    key,
+                    _seal(data, jittered_exp, stale),
+                    jittered_exp + stale,
+                    tags(response, kwargs) if tags else (),
+                )
+                await pipe.execute()
+            _remember(key, namespace, exp, value, size)
+            return value
+
+        async def revalidate(redis: Redis, key: str, body: bytes, args, kwargs):
+            logger.debug("Cache STALE: %s", key)
+            _count(namespace, "stale")
+            try:
+                response = await func(*args, **kwargs)
+            except HTTPException:
+                raise
+            except Exception:
+                if not stale_if_error:
+                    raise
+                logger.warning(
+                    "Refresh of %s failed, serving stale", key, exc_info=True
+                )
+                return _load(body, raw, namespace=namespace)
+            try:
+                value = await store(redis, key, response, kwargs)
+            except RedisError:
+                logger.warning("Cache write failed for key %s", key)
+                return response
+            return _respond(value, raw) if raw else response
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             redis: Redis = get_redis()
             key = _build_stable_key(func, kwargs, key_params, namespace)
 
+            if local_cache is not None:
+                value = local_cache.get(key)
+                if value is not MISSING:
+                    _count(namespace, "hit_l1")
+                    return _respond(value, raw)
+
             try:
                 cached = await redis.get(key)
                 if cached is not None:
+                    body, ttl = _unseal(cached, exp)
+                    if ttl <= 0 and await _claim_refresh(redis, key):
+                        return await revalidate(redis, key, body, args, kwargs)
                     logger.debug("Cache HIT: %s", key)
-                    await redis.incr(f"metrics:cache:hit:{namespace}")
-                    decompressed = zlib.decompress(cached).decode()
-                    return json.loads(decompressed)
+                    _count(namespace, "hit")
+                    return _load(body, raw, key, namespace, ttl)
             except RedisError:
                 logger.warning("Redis read error for key %s, falling throgh", key)
+                metrics.inc(
+                    "cache_fallthroughs_total",
+                    namespace=namespace,
+                    reason="redis_error",
+                )
 
             # Only one request computes; others wait
             lock_key = f"lock:{key}"
             lock = redis.lock(lock_key, timeout=10, blocking_timeout=5)
 
-            if await lock.acquire(blocking=True):
+            started = time.perf_counter()
+            acquired = await lock.acquire(blocking=True)
+            metrics.observe(
+                "cache_lock_wait_seconds",
+                time.perf_counter() - started,
+                namespace=namespace,
+            )
+            if acquired:
                 try:
                     # Double check
                     cached = await redis.get(key)
                     if cached is not None:
                         logger.debug("Cache HIT: %s", key)
-                        await redis.incr(f"metrics:cache:hit:{namespace}")
-                        decompressed = zlib.decompress(cached).decode()
-                        return json.loads(decompressed)
+                        _count(namespace, "hit")
+                        body, ttl = _unseal(cached, exp)
+                        return _load(body, raw, key, namespace, ttl)
 
                     logger.debug("Cache MISS: %s", key)
-                    await redis.incr(f"metrics:cache:miss:{namespace}")
+                    _count(namespace, "miss")
                     response = await func(*args, **kwargs)
-
-                    serializable = _serialize(response, response_model)
-                    encoded = json.dumps(serializable)
-                    compressed = zlib.compress(encoded.encode())
-                    jittered_exp = exp + random.randint(0, exp // 10)
-                    await redis.set(key, compressed, ex=jittered_exp)
-
-                    return response
+                    value = await store(redis, key, response, kwargs)
+                    return _respond(value, raw) if raw else response
                 except Exception:
                     logger.warning("Cache write failed for key %s", key, exc_info=True)
+                    metrics.inc(
+                        "cache_fallthroughs_total", namespace=namespace, reason="error"
+                    )
                     return await func(*args, **kwargs)
                 finally:
                     await lock.release()
@@ -134,20 +229,123 @@ def cache(
                 cached = await redis.get(key)
                 if cached is not None:
                     logger.debug("Cache HIT: %s", key)
-                    await redis.incr(f"metrics:cache:hit:{namespace}")
-                    decompressed = zlib.decompress(cached).decode()
-                    return json.loads(decompressed)
-                await redis.incr(f"metrics:cache:miss:{namespace}")
+                    _count(namespace, "hit")
+                    body, ttl = _unseal(cached, exp)
+                    return _load(body, raw, key, namespace, ttl)
+                _count(namespace, "miss")
+                metrics.inc(
+                    "cache_fallthroughs_total",
+                    namespace=namespace,
+                    reason="lock_timeout",
+                )
                 return await func(*args, **kwargs)
 
         wrapper._cache_namespace = namespace
         wrapper._cache_key_params = key_params
         wrapper._cache_func = func
+        wrapper._cache_exp = exp
+        wrapper._cache_response_model = response_model
+        wrapper._cache_raw = raw
+        wrapper._cache_stale = stale
+        wrapper._cache_tags = tags
         return wrapper
 
     return decorator
 
 
+def _count(namespace: str, result: str, value: int = 1) -> None:
+    metrics.inc("cache_requests_total", value, namespace=namespace, result=result)
+
+
+async def _claim_refresh(redis: Redis, key: str) -> bool:
+    # The claim isn't released: after a failed refresh it keeps the others
+    # on the stale value until it lapses, instead of all retrying at once.
+    claimed = await redis.set(f"refresh:{key}", 1, nx=True, ex=REFRESH_CLAIM_TTL)
+    return bool(claimed)
+
+
+def _tag_key(tag: str) -> str:
+    return f"{PREFIX}:tag:{tag}"
+
+
+async def _queue_write(pipe, key: str, value: bytes, ttl: int, tags: Iterable[str]):
+    """Queue the entry and its membership in each tag's set of dependents.
+
+    A tag set lives as long as its longest-lived member: NX sets the expiry
+    on a new set, GT only ever extends it."""
+    await pipe.set(key, value, ex=ttl)
+    for tag in tags:
+        tag_key = _tag_key(tag)
+        await pipe.sadd(tag_key, key)
+        await pipe.expire(tag_key, ttl, nx=True)
+        await pipe.expire(tag_key, ttl, gt=True)
+
+
+def _seal(data: bytes, exp: int, stale: int) -> bytes:
+    """Entries with a stale window are stamped with the time they stop
+    being fresh."""
+    if not stale:
+        return data
+    return stamp(data, time.time() + exp)
+
+
+def _unseal(cached: bytes, exp: int) -> tuple[bytes, float]:
+    """The encoded value and how many more seconds it is fresh for.
+
+    Unstamped entries, such as those written before the namespace had a
+    stale window, count as fresh."""
+    data, fresh_until = unstamp(cached)
+    if fresh_until is None:
+        return data, exp
+    return data, fresh_until - time.time()
+
+
+def _encode(response: Any, response_model, raw: bool) -> tuple[Any, bytes, int]:
+    """The value as hits will see it, its encoding and its serialized size."""
+    if raw:
+        body = _render(response, response_model)
+        return body, *codec.encode_raw(body)
+    value = _serialize(response, response_model)
+    return value, *codec.encode(value)
+
+
+def _load(
+    data: bytes,
+    raw: bool,
+    key: str | None = None,
+    namespace: str = "default",
+    ttl: float = 0,
+) -> Any:
+    """Decode a cached value, keeping it in the L1 for up to `ttl`."""
+    started = time.perf_counter()
+    value, size = codec.decode(data, raw)
+    metrics.observe(
+        "cache_decode_seconds", time.perf_counter() - started, namespace=namespace
+    )
+    if key is not None and ttl > 0 and local_cache is not None:
+        local_cache.set(key, value, size, namespace, ttl)
+    return _respond(value, raw)
+
+
+def _remember(key: str, namespace: str, exp: int, value: Any, size: int) -> None:
+    """Keep a freshly computed result in this process's L1 too."""
+    if local_cache is not None:
+        local_cache.set(key, value, size, namespace, exp)
+
+
+def _respond(value: Any, raw: bool) -> Any:
+    if raw:
+        return Response(content=value, media_type="application/json")
+    return value
+
+
+def _render(response: Any, response_model=None) -> bytes:
+    """The JSON body FastAPI would send for `response`."""
+    if isinstance(response, Response):
+        return response.body
+    return dumps_json(_serialize(response, response_model))
+
+
 def _serialize(obj: Any, response_model=None) -> Any:
     from pydantic import BaseModel
 
@@ -160,6 +358,41 @@ def _serialize(obj: Any, response_model=None) -> Any:
     return jsonable_encoder(obj)
 
 
+async def _broadcast(message: str) -> None:
+    try:
+        await get_redis().publish(INVALIDATION_CHANNEL, message)
+    except RedisError:
+        logger.warning("Failed to broadcast cache invalidation %s", message)
+
+
+def _apply_invalidation(message: bytes) -> None:
+    kind, _, target = message.decode().partition(":")
+    if kind == "key":
+        for key in target.split():
+            local_cache.invalidate(key)
+    elif kind == "ns":
+        local_cache.invalidate_namespace(target)
+
+
+async def listen_for_invalidations() -> None:
+    """Apply invalidations broadcast by every worker to this process's L1.
+
+    Pub/sub drops messages while nobody listens, so the L1 is cleared
+    whenever the subscription is (re)established."""
+    while True:
+        try:
+            async with get_redis().pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                local_cache.clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        _apply_invalidation(message["data"])
+        except RedisError:
+            logger.warning("Cache invalidation subscription lost, retrying")
+            local_cache.clear()
+            await asyncio.sleep(1)
+
+
 async def invalidate_namespace(namespace: str, cache=True) -> int:
     redis: Redis = get_redis()
     pattern = f"{PREFIX}:{namespace}:*" if cache else f"{namespace}:*"
@@ -173,19 +406,107 @@ async def invalidate_namespace(namespace: str, cache=True) -> int:
     except RedisError:
         logger.warning("Failed to invalidate namespace '%s'", namespace)
 
+    if cache and local_cache is not None:
+        local_cache.invalidate_namespace(namespace)
+        await _broadcast(f"ns:{namespace}")
     return deleted
 
 
+def cache_key(fn: Callable, **kwargs) -> str:
+    """The key `fn`, decorated with `cache`, stores its result under when
+    called with `kwargs`."""
+    namespace = getattr(fn, "_cache_namespace", "default")
+    key_params = getattr(fn, "_cache_key_params", None)
+    original_func = getattr(fn, "_cache_func", fn)
+    return _build_stable_key(original_func, kwargs, key_params, namespace)
+
+
+async def get_many(fn: Callable, calls: list[dict]) -> list[Any]:
+    """Read what `fn` cached for each kwargs dict in `calls`: the L1 first,
+    then a single MGET for the rest. Misses, and every entry not in the L1
+    when Redis is unavailable, are None."""
+    if not calls:
+        return []
+    redis = get_redis()
+    namespace = getattr(fn, "_cache_namespace", "default")
+    exp = getattr(fn, "_cache_exp", 60)
+    raw = getattr(fn, "_cache_raw", False)
+    keys = [cache_key(fn, **kwargs) for kwargs in calls]
+
+    results: list[Any] = [None] * len(keys)
+    remote = list(range(len(keys)))
+    if local_cache is not None:
+        remote = []
+        for i, key in enumerate(keys):
+            value = local_cache.get(key)
+            if value is MISSING:
+                remote.append(i)
+            else:
+                results[i] = _respond(value, raw)
+        if len(remote) < len(keys):
+            _count(namespace, "hit_l1", len(keys) - len(remote))
+    if not remote:
+        return results
+
+    try:
+        values = await redis.mget([keys[i] for i in remote])
+    except RedisError:
+        logger.warning("Redis MGET failed for namespace '%s'", namespace)
+        metrics.inc(
+            "cache_fallthroughs_total",
+            len(remote),
+            namespace=namespace,
+            reason="redis_error",
+        )
+        return results
+
+    hits = 0
+    for i, value in zip(remote, values):
+        if value is not None:
+            hits += 1
+            # Stale entries are served as is; the decorated call refreshes them.
+            body, ttl = _unseal(value, exp)
+            results[i] = _load(body, raw, keys[i], namespace, ttl)
+    if hits:
+        _count(namespace, "hit", hits)
+    if hits < len(values):
+        _count(namespace, "miss", len(values) - hits)
+    return results
+
+
+async def set_many(fn: Callable, results: list[tuple[dict, Any]]) -> None:
+    """Backfill `fn`'s cache with (kwargs, result) pairs in one pipeline, as if
+    each had been computed by the decorated call."""
+    if not results:
+        return
+    exp = getattr(fn, "_cache_exp", 60)
+    response_model = getattr(fn, "_cache_response_model", None)
+    raw = getattr(fn, "_cache_raw", False)
+    stale = getattr(fn, "_cache_stale", 0)
+    tags = getattr(fn, "_cache_tags", None)
+    try:
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for kwargs, result in results:
+                jittered_exp = exp + random.randint(0, exp // 10)
+                _, data, _ = _encode(result, response_model, raw)
+                await _queue_write(
+                    pipe,
+                    cache_key(fn, **kwargs),
+                    _seal(data, jittered_exp, stale),
+                    jittered_exp + stale,
+                    tags(result, kwargs) if tags else (),
+                )
+            await pipe.execute()
+    except RedisError:
+        logger.warning("Cache backfill failed for %s", fn.__name__)
+
+
 async def invalidate_for(*cached_funcs, **kwargs) -> int:
     redis = get_redis()
     deleted = 0
 
     for fn in cached_funcs:
-        namespace = getattr(fn, "_cache_namespace", "default")
-        key_params = getattr(fn, "_cache_key_params", None)
-        original_func = getattr(fn, "_cache_func", fn)
-
-        key = _build_stable_key(original_func, kwargs, key_params, namespace)
+        key = cache_key(fn, **kwargs)
         try:
             result = await redis.delete(key)
             if result:
@@ -193,4 +514,41 @@ async def invalidate_for(*cached_funcs, **kwargs) -> int:
                 logger.info("Invalidated key: %s", key)
         except RedisError:
             logger.warning("Failed to invalidate key %s", key)
+        if local_cache is not None:
+            local_cache.invalidate(key)
+            await _broadcast(f"key:{key}")
     return deleted
+
+
+async def invalidate_tags(*tags: str) -> int:
+    """Drop every entry that depends on any of `tags`: one round trip to read
+    the dependents, one transaction to UNLINK them.
+
+    Only the members read are removed from the tag sets, so an entry written
+    in between keeps its membership."""
+    redis = get_redis()
+    tag_keys = [_tag_key(tag) for tag in tags]
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                await pipe.smembers(tag_key)
+            members = await pipe.execute()
+        keys = set().union(*members)
+        if keys:
+            async with redis.pipeline(transaction=True) as pipe:
+                await pipe.unlink(*keys)
+                for tag_key, dependents in zip(tag_keys, members):
+                    if dependents:
+                        await pipe.srem(tag_key, *dependents)
+                await pipe.execute()
+    except RedisError:
+        logger.warning("Failed to invalidate tags %s", ", ".join(tags))
+        return 0
+
+    logger.info("Invalidated %d keys for tags %s", len(keys), ", ".join(tags))
+    if keys and local_cache is not None:
+        decoded = [key.decode() for key in keys]
+        for key in decoded:
+            local_cache.invalidate(key)
+        await _broadcast("key:" + " ".join(decoded))
+    return len(keys)
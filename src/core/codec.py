@@ -0,0 +1,174 @@
+"""Encoding of cached values.
+
+Every value starts with a header byte: the top two bits are the format
+version, then three bits name the serializer and three the compressor, so
+entries stay readable across configuration changes. Values without a
+header are the zlib-compressed JSON written before the header existed.
+
+Entries with a stale window are wrapped by `stamp`: a header byte with
+version bits 3, the time the entry stops being fresh, then the entry.
+
+orjson, msgpack, lz4 and zstandard are optional (the `fast-cache` extra);
+orjson is used for JSON whenever it is installed.
+"""
+
+import json
+import struct
+import zlib
+from functools import cache
+from typing import Any
+
+from src.conf import settings
+
+VERSION = 2
+STAMPED = 3 << 6
+
+JSON = 0
+MSGPACK = 1
+RAW = 2
+
+NONE = 0
+ZLIB = 1
+LZ4 = 2
+ZSTD = 3
+
+# zlib's default, as before the header existed. Level 1 encodes faster but
+# stores ~40% more per entry and decodes no faster.
+ZLIB_LEVEL = 6
+
+SERIALIZERS = {"json": JSON, "msgpack": MSGPACK}
+COMPRESSORS = {"none": NONE, "zlib": ZLIB, "lz4": LZ4, "zstd": ZSTD}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@cache
+def _require(module: str):
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise RuntimeError(
+            f"The cache codec needs the {module} package: install the fast-cache extra"
+        ) from e
+
+
+@cache
+def _zstd():
+    zstandard = _require("zstandard")
+    return zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor()
+
+
+def dumps_json(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _loads_json(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _serialize(serializer: int, value: Any) -> bytes:
+    if serializer == MSGPACK:
+        return _require("msgpack").packb(value, use_bin_type=True)
+    return dumps_json(value)
+
+
+def _deserialize(serializer: int, data: bytes) -> Any:
+    if serializer == MSGPACK:
+        return _require("msgpack").unpackb(data, raw=False)
+    return _loads_json(data)
+
+
+def _compress(compressor: int, data: bytes) -> bytes:
+    if compressor == ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    if compressor == LZ4:
+        return _require("lz4.frame").frame.compress(data)
+    if compressor == ZSTD:
+        return _zstd()[0].compress(data)
+    return data
+
+
+def _decompress(compressor: int, data: bytes) -> bytes:
+    if compressor == ZLIB:
+        return zlib.decompress(data)
+    if compressor == LZ4:
+        return _require("lz4.frame").frame.decompress(data)
+    if compressor == ZSTD:
+        return _zstd()[1].decompress(data)
+    return data
+
+
+class Codec:
+    def __init__(
+        self, serializer: str = "json", compressor: str = "zlib", min_size: int = 512
+    ) -> None:
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer {serializer!r}")
+        if compressor not in COMPRESSORS:
+            raise ValueError(f"Unknown cache compressor {compressor!r}")
+        self.serializer = SERIALIZERS[serializer]
+        self.compressor = COMPRESSORS[compressor]
+        self.min_size = min_size
+        # Fail at startup rather than on the first cache write.
+        _compress(self.compressor, _serialize(self.serializer, None))
+
+    def encode(self, value: Any) -> tuple[bytes, int]:
+        """Encode a JSON-compatible value; returns the data and the size of
+        the serialized, uncompressed value."""
+        return self._pack(self.serializer, _serialize(self.serializer, value))
+
+    def encode_raw(self, body: bytes) -> tuple[bytes, int]:
+        """Store an already encoded body verbatim."""
+        return self._pack(RAW, body)
+
+    def decode(self, data: bytes, raw: bool = False) -> tuple[Any, int]:
+        """The value, or with `raw` its JSON body, and its serialized size.
+
+        Either works whichever way the entry was written, so an endpoint can
+        switch modes without its cached entries turning unreadable."""
+        header = data[0]
+        if header >> 6 != VERSION:
+            serializer, payload = JSON, zlib.decompress(data)
+        else:
+            serializer = header >> 3 & 0b111
+            payload = _decompress(header & 0b111, data[1:])
+        if serializer == RAW:
+            return payload if raw else _loads_json(payload), len(payload)
+        if raw and serializer == JSON:
+            return payload, len(payload)
+        value = _deserialize(serializer, payload)
+        return dumps_json(value) if raw else value, len(payload)
+
+    def _pack(self, serializer: int, payload: bytes) -> tuple[bytes, int]:
+        compressor = self.compressor if len(payload) >= self.min_size else NONE
+        header = VERSION << 6 | serializer << 3 | compressor
+        return bytes([header]) + _compress(compressor, payload), len(payload)
+
+
+_STAMP = struct.Struct("!d")
+
+
+def stamp(data: bytes, fresh_until: float) -> bytes:
+    return bytes([STAMPED]) + _STAMP.pack(fresh_until) + data
+
+
+def unstamp(data: bytes) -> tuple[bytes, float | None]:
+    """The entry and the time it stops being fresh, None if not stamped."""
+    if data[0] != STAMPED:
+        return data, None
+    (fresh_until,) = _STAMP.unpack_from(data, 1)
+    return data[1 + _STAMP.size :], fresh_until
+
+
+codec = Codec(
+    serializer=settings.CACHE_SERIALIZER,
+    compressor=settings.CACHE_COMPRESSION,
+    min_size=settings.CACHE_COMPRESS_MIN_BYTES,
+)
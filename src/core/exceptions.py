@@ -9,3 +9,7 @@ class UniqueConstraintError(RepositoryError):
 class ForeignKeyConstraintError(RepositoryError):
     def __init__(self, constraint_name: str):
         self.constraint_name = constraint_name
+
+
+class InvalidCursorError(ValueError):
+    pass
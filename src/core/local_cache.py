@@ -0,0 +1,125 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from src.core.metrics import metrics
+
+MISSING = object()
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    namespace: str
+    expires_at: float
+
+
+class LocalCache:
+    """Per-process LRU of decoded cache values, bounded by their encoded size
+    overall and, optionally, per namespace.
+
+    Values are shared between requests and must be treated as read-only.
+    Entries also expire after at most `ttl` seconds, which bounds staleness
+    if an invalidation message is lost.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        namespace_max_bytes: dict[str, int] | None = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.namespace_max_bytes = namespace_max_bytes or {}
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._namespaces: dict[str, OrderedDict[str, _Entry]] = {}
+        self._bytes = 0
+        self._namespace_bytes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Any:
+        """The cached value, or MISSING."""
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            return MISSING
+        self._entries.move_to_end(key)
+        self._namespaces[entry.namespace].move_to_end(key)
+        return entry.value
+
+    def set(self, key: str, value: Any, size: int, namespace: str, ttl: float) -> None:
+        self._remove(key)
+        limit = min(
+            self.namespace_max_bytes.get(namespace, self.max_bytes), self.max_bytes
+        )
+        if size > limit:
+            return
+        entry = _Entry(value, size, namespace, time.monotonic() + min(ttl, self.ttl))
+        self._entries[key] = entry
+        self._namespaces.setdefault(namespace, OrderedDict())[key] = entry
+        self._bytes += size
+        self._namespace_bytes[namespace] = (
+            self._namespace_bytes.get(namespace, 0) + size
+        )
+
+        # A namespace over its own limit gives up its least recently used
+        # entries first, so one busy namespace can't flush the others.
+        namespace_entries = self._namespaces[namespace]
+        while self._namespace_bytes[namespace] > limit:
+            self._evict(next(iter(namespace_entries)))
+        while self._bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def invalidate(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        self._remove(key)
+        _count_invalidations(entry.namespace)
+        return True
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        keys = list(self._namespaces.get(namespace, ()))
+        for key in keys:
+            self._remove(key)
+        if keys:
+            _count_invalidations(namespace, len(keys))
+        return len(keys)
+
+    def clear(self) -> None:
+        for namespace, entries in self._namespaces.items():
+            _count_invalidations(namespace, len(entries))
+        self._entries.clear()
+        self._namespaces.clear()
+        self._namespace_bytes.clear()
+        self._bytes = 0
+
+    def _evict(self, key: str) -> None:
+        metrics.inc("cache_l1_evictions_total", namespace=self._entries[key].namespace)
+        self._remove(key)
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        namespace_entries = self._namespaces[entry.namespace]
+        del namespace_entries[key]
+        if not namespace_entries:
+            del self._namespaces[entry.namespace]
+        self._bytes -= entry.size
+        self._namespace_bytes[entry.namespace] -= entry.size
+        return True
+
+
+def _count_invalidations(namespace: str, value: int = 1) -> None:
+    metrics.inc("cache_l1_invalidations_total", value, namespace=namespace)
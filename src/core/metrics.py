@@ -0,0 +1,99 @@
+import asyncio
+import re
+from collections import defaultdict
+
+from redis.asyncio import Redis, RedisError
+
+from src.core.logging_conf import logger
+
+METRICS_KEY = "metrics"
+FLUSH_INTERVAL = 10
+
+COUNTER = "counter"
+SUMMARY = "summary"
+
+_TYPES = {
+    "cache_requests_total": COUNTER,
+    "cache_fallthroughs_total": COUNTER,
+    "cache_lock_wait_seconds": SUMMARY,
+    "cache_payload_bytes": SUMMARY,
+    "cache_decode_seconds": SUMMARY,
+    "cache_l1_evictions_total": COUNTER,
+    "cache_l1_invalidations_total": COUNTER,
+    "like_batch_size": SUMMARY,
+    "like_batch_flush_seconds": SUMMARY,
+    "like_flush_dropped_total": COUNTER,
+}
+
+_SERIES = re.compile(r"^([a-z_]+?)(_sum|_count)?(\{.*\})?$")
+
+
+def _series(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+class Metrics:
+    """Counters and summaries aggregated in process and flushed to a Redis
+    hash as deltas, so recording costs no I/O and the hash holds the sum
+    over every worker.
+
+    Hash fields are Prometheus series, e.g.
+    `cache_requests_total{namespace="post",result="hit"}`.
+    """
+
+    def __init__(self) -> None:
+        self._pending: defaultdict[str, float] = defaultdict(float)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        self._pending[_series(name, labels)] += value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        self._pending[_series(f"{name}_sum", labels)] += value
+        self._pending[_series(f"{name}_count", labels)] += 1
+
+    async def flush(self, redis: Redis) -> None:
+        pending, self._pending = self._pending, defaultdict(float)
+        if not pending:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for series, value in pending.items():
+                    await pipe.hincrbyfloat(METRICS_KEY, series, value)
+                await pipe.execute()
+        except RedisError:
+            # Keep the deltas for the next attempt.
+            for series, value in pending.items():
+                self._pending[series] += value
+            logger.warning("Failed to flush metrics")
+
+    async def render(self, redis: Redis) -> str:
+        """Everything flushed so far, in the Prometheus text format."""
+        await self.flush(redis)
+        values = await redis.hgetall(METRICS_KEY)
+        lines, typed = [], set()
+        for series, value in sorted(
+            (k.decode(), v.decode()) for k, v in values.items()
+        ):
+            match = _SERIES.match(series)
+            name = match.group(1) if match else series
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {_TYPES.get(name, 'untyped')}")
+            number = float(value)
+            lines.append(f"{series} {int(number) if number.is_integer() else number}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+async def run_metrics_flusher(redis: Redis) -> None:
+    try:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await metrics.flush(redis)
+    finally:
+        await metrics.flush(redis)
@@ -0,0 +1,63 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+from sqlalchemy import tuple_
+
+from src.core.exceptions import InvalidCursorError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> tuple:
+    """Decode a cursor produced by `encode_cursor`, converting each value with
+    the matching callable in `types` (e.g. `aware_datetime`, `UUID`)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise InvalidCursorError
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (
+        AttributeError,
+        binascii.Error,
+        UnicodeDecodeError,
+        TypeError,
+        ValueError,
+    ) as e:
+        raise InvalidCursorError from e
+
+
+def aware_datetime(value: str) -> datetime:
+    """`datetime.fromisoformat` for cursor values compared against timestamptz
+    columns, which a naive datetime must not be."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        raise ValueError("cursor datetime has no timezone")
+    return parsed
+
+
+def keyset_after(columns: Sequence, values: Sequence, descending: bool = True):
+    """Row-value comparison that seeks past the last row of the previous page."""
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+def split_page(
+    rows: Sequence, limit: int, cursor_values: Callable[[Any], tuple]
+) -> tuple[list, str | None]:
+    """Queries fetch `limit + 1` rows; the extra row only tells us whether a
+    next page exists and is never returned."""
+    items = list(rows[:limit])
+    if len(rows) <= limit or not items:
+        return items, None
+    return items, encode_cursor(*cursor_values(items[-1]))
@@ -2,12 +2,21 @@ from typing import Any
 
 from asyncpg.exceptions import ForeignKeyViolationError, UniqueViolationError
 from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 
 from src.core.exceptions import ForeignKeyConstraintError, UniqueConstraintError
 from src.db import AsyncSession
 
 
+def raise_constraint_error(e: IntegrityError) -> None:
+    orig = e.orig.__cause__
+    if isinstance(orig, UniqueViolationError):
+        raise UniqueConstraintError from e
+    if isinstance(orig, ForeignKeyViolationError):
+        raise ForeignKeyConstraintError(orig.constraint_name) from e
+
+
 class CRUDRepository:
     model = None
 
@@ -29,22 +38,65 @@ class CRUDRepository:
         result = await self.session.execute(query)
         return result.scalars().all()
 
-    async def create(self, new_data: dict):
+    async def create(self, new_data: dict, commit: bool = True):
         if not new_data:
             raise ValueError("new_data cannot be empty")
 
         try:
             stmt = insert(self.model).values(**new_data).returning(self.model)
             result = await self.session.execute(stmt)
-            await self.session.commit()
+            if commit:
+                await self.session.commit()
             return result.scalar_one_or_none()
         except IntegrityError as e:
             await self.session.rollback()
-            orig = e.orig.__cause__
-            if isinstance(orig, UniqueViolationError):
-                raise UniqueConstraintError from e
-            if isinstance(orig, ForeignKeyViolationError):
-                raise ForeignKeyConstraintError(orig.constraint_name) from e
+            raise_constraint_error(e)
+            raise
+
+    async def create_or_ignore(self, new_data: dict, commit: bool = True, model=None):
+        """Insert unless the row conflicts with an existing one, in which case
+        return None. Unlike `create`, a duplicate costs no failed statement or
+        rollback. `model` defaults to the repository's model."""
+        if not new_data:
+            raise ValueError("new_data cannot be empty")
+
+        model = model or self.model
+        stmt = (
+            pg_insert(model)
+            .values(**new_data)
+            .on_conflict_do_nothing()
+            .returning(model)
+        )
+        try:
+            result = await self.session.execute(stmt)
+            row = result.scalar_one_or_none()
+            if commit:
+                await self.session.commit()
+            return row
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise_constraint_error(e)
+            raise
+
+    async def create_many_or_ignore(
+        self, rows: list[dict], commit: bool = True, model=None
+    ) -> list:
+        """`create_or_ignore` for many rows in one statement; returns only the
+        rows actually inserted."""
+        if not rows:
+            raise ValueError("rows cannot be empty")
+
+        model = model or self.model
+        stmt = pg_insert(model).values(rows).on_conflict_do_nothing().returning(model)
+        try:
+            result = await self.session.execute(stmt)
+            inserted = result.scalars().all()
+            if commit:
+                await self.session.commit()
+            return inserted
+        except IntegrityError as e:
+            await self.session.rollback()
+            raise_constraint_error(e)
             raise
 
     async def update_one_or_more(self, updated_data: dict, **filter_by):
@@ -64,10 +116,12 @@ class CRUDRepository:
         await self.session.commit()
         return result.scalars().all()
 
-    async def delete_one_or_more(self, **filter_by):
+    async def delete_one_or_more(self, commit: bool = True, **filter_by):
         if not filter_by:
             raise ValueError("filter_by cannot be empty")
         stmt = delete(self.model).filter_by(**filter_by).returning(self.model)
         result = await self.session.execute(stmt)
-        await self.session.commit()
-        return result.scalars().all()
+        rows = result.scalars().all()
+        if commit:
+            await self.session.commit()
+        return rows
@@ -1,15 +1,22 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 from src.auth.router import api_router as auth_router
 from src.conf import settings
-from src.core.cache import RedisError, redis_manager
+from src.core.cache import (
+    RedisError,
+    listen_for_invalidations,
+    local_cache,
+    redis_manager,
+)
 from src.core.logging_conf import logger
+from src.core.metrics import metrics, run_metrics_flusher
 from src.core.rate_limiter import (
     rate_limiter_auth,
     rate_limiter_comments,
@@ -19,13 +26,24 @@ from src.posts.api.comments import router as api_comments_router
 from src.posts.api.posts import api_router as api_posts_router
 from src.posts.api.posts import template_router as template_posts_router
 from src.posts.api.tags import router as api_tags_router
+from src.posts.api.users import router as api_users_router
+from src.posts.jobs import run_like_flusher
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await redis_manager.initialize()
     logger.info("Redis connection open")
+    tasks = [asyncio.create_task(run_metrics_flusher(redis_manager.get_client()))]
+    if settings.LIKES_WRITE_BEHIND:
+        tasks.append(asyncio.create_task(run_like_flusher()))
+    if local_cache is not None:
+        tasks.append(asyncio.create_task(listen_for_invalidations()))
     yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     await redis_manager.close()
     logger.info("Redis connection closed")
 
@@ -48,6 +66,16 @@ async def redis_health():
         raise HTTPException(503, "Redis unavailable")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Totals across every worker, as of each one's last flush.
+    try:
+        body = await metrics.render(redis_manager.get_client())
+    except RedisError:
+        raise HTTPException(503, "Redis unavailable")
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
 app.include_router(
     api_posts_router,
     prefix="/api/posts",
@@ -57,6 +85,13 @@ app.include_router(
 
 app.include_router(api_tags_router, prefix="/api/tags", tags=["post tags"])
 
+app.include_router(
+    api_users_router,
+    prefix="/api/users",
+    tags=["users"],
+    dependencies=[Depends(rate_limiter_posts)],
+)
+
 app.include_router(
     api_comments_router,
     prefix="/api/comments",
@@ -1,21 +1,43 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Query, Response, status
 
 from src.auth.dependencies import GetCurrentUserDep
-from src.core.cache import cache
+from src.core.cache import cache, invalidate_tags
+from src.core.codec import dumps_json
+from src.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from src.posts.dependencies import CommentLikeServiceDep, CommentServiceDep
 from src.posts.exceptions import CommentNotFoundException
+from src.posts.repository import comment_path_ids
 from src.posts.schemas import (
     CommentCreate,
     CommentLikeResponse,
+    CommentPage,
     CommentResponse,
+    CommentSort,
     CommentUpdate,
     CommentWithChildren,
+    LikersPage,
+    ThreadPage,
 )
+from src.posts.service import CommentLikeService
 
 router = APIRouter()
 
+MAX_TREE_DEPTH = 10
+MAX_TREE_CHILDREN = 50
+
+
+# Subtree and thread views are tagged with their root comment; a write drops
+# the views rooted at the comment and at each of its ancestors.
+def _comment_tags(comment) -> list[str]:
+    return [f"comment:{i}" for i in comment_path_ids(comment.path)]
+
+
+def _view_tags(_, kwargs: dict) -> list[str]:
+    return [f"comment:{kwargs['comment_id']}"]
+
 
 @router.get("/{comment_id}", response_model=CommentResponse)
 async def get_comment(
@@ -29,9 +51,24 @@ async def get_comment(
     return comment
 
 
-@router.get("/", response_model=list[CommentResponse])
-async def get_user_comments(service: CommentServiceDep, user: GetCurrentUserDep):
-    return await service.get_comments(user.id)
+@router.get("/", response_model=CommentPage)
+async def get_user_comments(
+    service: CommentServiceDep,
+    user: GetCurrentUserDep,
+    post_id: UUID | None = None,
+    user_id: UUID | None = None,
+    sort: CommentSort = CommentSort.newest,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    return await service.get_comments(
+        user.id,
+        limit=limit,
+        sort=sort,
+        post_id=post_id,
+        author_id=user_id,
+        cursor=cursor,
+    )
 
 
 @router.post(
@@ -44,7 +81,9 @@ async def create_comment(
     service: CommentServiceDep,
     user: GetCurrentUserDep,
 ):
-    return await service.create_comment(comment, user.id)
+    comment = await service.create_comment(comment, user.id)
+    await invalidate_tags(f"post:{comment.post_id}:activity", *_comment_tags(comment))
+    return comment
 
 
 @router.put(
@@ -59,6 +98,7 @@ async def update_comment(
     comment = await service.update_comment(comment_id, user.id, comment)
     if not comment:
         raise CommentNotFoundException
+    await invalidate_tags(f"post:{comment.post_id}:activity", *_comment_tags(comment))
     return comment
 
 
@@ -68,9 +108,16 @@ async def delete_comment(
     service: CommentServiceDep,
     user: GetCurrentUserDep,
 ):
-    comment = await service.delete_comment(comment_id, user.id)
-    if not comment:
+    deleted = await service.delete_comment(comment_id, user.id)
+    if not deleted:
         raise CommentNotFoundException
+    comment, removed_ids = deleted
+    # Views rooted anywhere in the removed subtree go too.
+    await invalidate_tags(
+        f"post:{comment.post_id}:activity",
+        *_comment_tags(comment)[:-1],
+        *(f"comment:{i}" for i in removed_ids),
+    )
     return {"message": "successfully deleted"}
 
 
@@ -82,18 +129,68 @@ async def delete_comment(
 @cache(
     exp=300,
     namespace="comments",
-    key_params=["comment_id"],
-    response_model=CommentWithChildren,
+    key_params=["comment_id", "max_depth", "max_children", "cursor"],
+    raw=True,
+    tags=_view_tags,
 )
 async def get_comments_with_childrens(
     comment_id: UUID,
     service: CommentServiceDep,
     _: GetCurrentUserDep,
+    max_depth: Annotated[int, Query(ge=1, le=MAX_TREE_DEPTH)] = 3,
+    max_children: Annotated[int, Query(ge=1, le=MAX_TREE_CHILDREN)] = 10,
+    cursor: str | None = None,
 ):
-    comment = await service.get_comments_with_children(comment_id=comment_id)
+    comment = await service.get_comments_with_children(
+        comment_id=comment_id,
+        max_depth=max_depth,
+        max_children=max_children,
+        cursor=cursor,
+    )
     if not comment:
         raise CommentNotFoundException
-    return comment
+    return Response(content=dumps_json(comment), media_type="application/json")
+
+
+@router.get(
+    "/{comment_id}/thread",
+    status_code=status.HTTP_200_OK,
+    response_model=ThreadPage,
+)
+@cache(
+    exp=300,
+    namespace="comments",
+    key_params=["comment_id", "max_depth", "limit", "cursor"],
+    response_model=ThreadPage,
+    raw=True,
+    tags=_view_tags,
+)
+async def get_comment_thread(
+    comment_id: UUID,
+    service: CommentServiceDep,
+    _: GetCurrentUserDep,
+    max_depth: Annotated[int, Query(ge=0, le=MAX_TREE_DEPTH)] = 3,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    thread = await service.get_thread(
+        comment_id=comment_id, max_depth=max_depth, limit=limit, cursor=cursor
+    )
+    if not thread:
+        raise CommentNotFoundException
+    return thread
+
+
+@cache(
+    exp=300,
+    namespace="comment_likers",
+    key_params=["comment_id", "limit", "cursor"],
+    tags=lambda _, kwargs: [f"comment:{kwargs['comment_id']}:likes"],
+)
+async def _comment_likers_page(
+    comment_id: UUID, limit: int, cursor: str | None, service: CommentLikeService
+) -> dict:
+    return await service.get_likers(comment_id=comment_id, limit=limit, cursor=cursor)
 
 
 @router.post(
@@ -104,7 +201,9 @@ async def get_comments_with_childrens(
 async def like_comment(
     comment_id: UUID, service: CommentLikeServiceDep, user: GetCurrentUserDep
 ):
-    return await service.like_comment(comment_id=comment_id, user_id=user.id)
+    like = await service.like_comment(comment_id=comment_id, user_id=user.id)
+    await invalidate_tags(f"comment:{comment_id}:likes")
+    return like
 
 
 @router.delete("/{comment_id}/like", status_code=status.HTTP_204_NO_CONTENT)
@@ -114,3 +213,23 @@ async def unlike_comment(
     user: GetCurrentUserDep,
 ):
     await service.unlike_comment(comment_id=comment_id, user_id=user.id)
+    await invalidate_tags(f"comment:{comment_id}:likes")
+
+
+@router.get(
+    "/{comment_id}/likes",
+    status_code=status.HTTP_200_OK,
+    response_model=LikersPage,
+)
+async def get_who_liked_comment(
+    comment_id: UUID,
+    service: CommentLikeServiceDep,
+    _: GetCurrentUserDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    total = await service.get_likes_count(comment_id=comment_id)
+    page = await _comment_likers_page(
+        comment_id=comment_id, limit=limit, cursor=cursor, service=service
+    )
+    return {**page, "total": total}
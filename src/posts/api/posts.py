@@ -1,25 +1,43 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Request, status
+from fastapi import APIRouter, Query, Request, status
 from fastapi.templating import Jinja2Templates
 
 from src.auth.dependencies import GetCurrentUserDep
-from src.core.cache import cache, invalidate_for
-from src.posts.dependencies import PostLikeServiceDep, PostServiceDep, TagServiceDep
+from src.core.cache import cache, get_many, invalidate_tags, set_many
+from src.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.posts.dependencies import (
+    HotPostsDep,
+    PostLikeServiceDep,
+    PostServiceDep,
+    TagServiceDep,
+)
 from src.posts.exceptions import (
     PostAccessDeniedException,
     PostNotFoundException,
 )
+from src.posts.hot import MAX_HOT_POSTS
 from src.posts.schemas import (
+    MAX_BULK_TAGS,
+    MAX_FILTER_TAGS,
+    LikersPage,
+    PostBatch,
+    PostBatchRequest,
     PostComments,
     PostCreate,
     PostLikeResponse,
+    PostPage,
     PostResponse,
+    PostSearchPage,
     PostTagResponse,
+    PostTagResult,
+    PostTagsUpdate,
     PostUpdate,
+    TagMatch,
     TagResponse,
-    UserLikedResponse,
 )
+from src.posts.service import PostLikeService, PostService
 
 template_router = APIRouter()
 api_router = APIRouter()
@@ -33,7 +51,7 @@ async def post_page(
     service: PostServiceDep,
     user: GetCurrentUserDep,
 ):
-    post = await service.get_post(id=post_id)
+    post = await service.get_post(post_id=post_id)
     if not post:
         raise PostNotFoundException
     if post.user_id != user.id:
@@ -48,35 +66,212 @@ async def home(
     request: Request,
     service: PostServiceDep,
     user: GetCurrentUserDep,
+    cursor: str | None = None,
 ) -> str:
-    posts = await service.get_user_posts(user.id)
+    page = await user_posts_page(
+        user_id=user.id, limit=DEFAULT_PAGE_SIZE, cursor=cursor, service=service
+    )
     return templates.TemplateResponse(
-        request, "home.html", {"posts": posts, "title": "Home"}
+        request,
+        "home.html",
+        {"posts": page["items"], "next_cursor": page["next_cursor"], "title": "Home"},
     )
 
 
-@api_router.get("/{post_id}", response_model=PostResponse)
+# Dependency tags: post:{id} covers everything showing the post, and
+# post:{id}:activity what also shows its likes and comments.
+def _post_tags(post_id) -> list[str]:
+    return [f"post:{post_id}", f"post:{post_id}:activity"]
+
+
+def _listed_posts(page: dict) -> list[str]:
+    return [f"post:{post['id']}" for post in page["items"]]
+
+
+def _feed_page_tags(page: dict, kwargs: dict) -> list[str]:
+    # Keyset pages past the first never gain newly created posts.
+    latest = ["feed:posts"] if kwargs["cursor"] is None else []
+    return _listed_posts(page) + latest
+
+
+def _user_page_tags(page: dict, kwargs: dict) -> list[str]:
+    return _listed_posts(page) + [f"user:{kwargs['user_id']}:posts"]
+
+
+def _tag_page_tags(page: dict, kwargs: dict) -> list[str]:
+    # Slugs too, for pages asking for tags that don't exist yet.
+    return (
+        _listed_posts(page)
+        + [f"tag:{tag_id}" for tag_id in page.get("tag_ids", [])]
+        + [f"slug:{slug}" for slug in kwargs["tags"]]
+    )
+
+
+# Post bodies are cached once for all viewers; is_liked is overlaid per request.
 @cache(
     exp=300,
     namespace="post",
-    key_params=["post_id", "user"],
-    response_model=PostResponse,
+    key_params=["post_id"],
+    tags=lambda _, kwargs: _post_tags(kwargs["post_id"]),
+)
+async def _post_body(post_id: UUID, service: PostService) -> dict:
+    post = await service.get_post_body(post_id=post_id)
+    if not post:
+        raise PostNotFoundException
+    return post
+
+
+# Feed pages are read by everyone at once; serve them stale while one
+# request refreshes, and through a database outage.
+@cache(
+    exp=600,
+    namespace="posts",
+    key_params=["limit", "cursor"],
+    stale=300,
+    stale_if_error=True,
+    tags=_feed_page_tags,
+)
+async def _posts_page(limit: int, cursor: str | None, service: PostService) -> dict:
+    return await service.get_posts(limit=limit, cursor=cursor)
+
+
+@cache(
+    exp=120,
+    namespace="user_posts",
+    key_params=["user_id", "limit", "cursor"],
+    tags=_user_page_tags,
+)
+async def user_posts_page(
+    user_id: UUID, limit: int, cursor: str | None, service: PostService
+) -> dict:
+    return await service.get_user_posts(user_id=user_id, limit=limit, cursor=cursor)
+
+
+@cache(
+    exp=600,
+    namespace="tag_posts",
+    key_params=["tags", "match", "limit", "cursor"],
+    stale=300,
+    stale_if_error=True,
+    tags=_tag_page_tags,
+)
+async def _tag_posts_page(
+    tags: list[str],
+    match: TagMatch,
+    limit: int,
+    cursor: str | None,
+    service: PostService,
+) -> dict:
+    return await service.get_posts(limit=limit, cursor=cursor, tags=tags, match=match)
+
+
+# New matches show up within the TTL; edited and deleted posts right away.
+@cache(
+    exp=180,
+    namespace="post_search",
+    key_params=["q", "limit", "cursor"],
+    tags=lambda page, _: _listed_posts(page),
 )
+async def _search_page(
+    q: str, limit: int, cursor: str | None, service: PostService
+) -> dict:
+    return await service.search_posts(q=q, limit=limit, cursor=cursor)
+
+
+async def _post_bodies(post_ids: list[UUID], service: PostService) -> dict:
+    """`_post_body` for many posts: one MGET, one query for the misses and
+    one pipeline to backfill them."""
+    cached = await get_many(_post_body, [{"post_id": i} for i in post_ids])
+    bodies = {i: body for i, body in zip(post_ids, cached) if body is not None}
+    misses = [i for i in post_ids if i not in bodies]
+    if misses:
+        loaded = await service.get_post_bodies(post_ids=misses)
+        await set_many(_post_body, [({"post_id": i}, b) for i, b in loaded.items()])
+        bodies.update(loaded)
+    return bodies
+
+
+@api_router.post("/batch", response_model=PostBatch)
+async def get_posts_batch(
+    data: PostBatchRequest,
+    service: PostServiceDep,
+    like_service: PostLikeServiceDep,
+    user: GetCurrentUserDep,
+):
+    post_ids = list(dict.fromkeys(data.ids))
+    bodies = await _post_bodies(post_ids, service)
+    posts = [bodies[i] for i in post_ids if i in bodies]
+    return {
+        "items": await like_service.with_is_liked(user.id, posts),
+        "missing": [i for i in post_ids if i not in bodies],
+    }
+
+
+@api_router.get("/hot", response_model=list[PostResponse])
+async def get_hot_posts(
+    hot: HotPostsDep,
+    service: PostServiceDep,
+    like_service: PostLikeServiceDep,
+    user: GetCurrentUserDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    offset: Annotated[int, Query(ge=0, le=MAX_HOT_POSTS)] = 0,
+):
+    post_ids = await hot.top(limit=limit, offset=offset)
+    bodies = await _post_bodies(post_ids, service)
+    posts = [bodies[i] for i in post_ids if i in bodies]
+    return await like_service.with_is_liked(user.id, posts)
+
+
+@api_router.get("/search", response_model=PostSearchPage)
+async def search_posts(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    service: PostServiceDep,
+    like_service: PostLikeServiceDep,
+    user: GetCurrentUserDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    # Normalize so trivially different spellings share a cache entry.
+    q = " ".join(q.lower().split())
+    page = await _search_page(q=q, limit=limit, cursor=cursor, service=service)
+    items = await like_service.with_is_liked(user.id, page["items"])
+    return {"items": items, "next_cursor": page["next_cursor"]}
+
+
+@api_router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: UUID,
     service: PostServiceDep,
+    like_service: PostLikeServiceDep,
     user: GetCurrentUserDep,
 ):
-    post = await service.get_post(post_id=post_id, user_id=user.id)
-    if not post:
-        raise PostNotFoundException
+    post = await _post_body(post_id=post_id, service=service)
+    [post] = await like_service.with_is_liked(user.id, [post])
     return post
 
 
-@api_router.get("/", response_model=list[PostResponse])
-@cache(exp=600, namespace="posts", key_params=["user"], response_model=PostResponse)
-async def get_posts(service: PostServiceDep, user: GetCurrentUserDep):
-    return await service.get_posts(user.id)
+@api_router.get("/", response_model=PostPage)
+async def get_posts(
+    service: PostServiceDep,
+    like_service: PostLikeServiceDep,
+    user: GetCurrentUserDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    tag: Annotated[list[str] | None, Query(max_length=MAX_FILTER_TAGS)] = None,
+    match: TagMatch = TagMatch.any,
+):
+    if tag:
+        page = await _tag_posts_page(
+            tags=sorted(set(tag)),
+            match=match,
+            limit=limit,
+            cursor=cursor,
+            service=service,
+        )
+    else:
+        page = await _posts_page(limit=limit, cursor=cursor, service=service)
+    items = await like_service.with_is_liked(user.id, page["items"])
+    return {"items": items, "next_cursor": page["next_cursor"]}
 
 
 @api_router.post(
@@ -90,7 +285,7 @@ async def create_post(
     user: GetCurrentUserDep,
 ):
     post = await service.create_post(post, user.id)
-    await invalidate_for(get_posts, user=user)
+    await invalidate_tags("feed:posts", f"user:{user.id}:posts")
     return post
 
 
@@ -106,13 +301,7 @@ async def update_post(
     post = await service.update_post(post_id, user.id, post)
     if not post:
         raise PostNotFoundException
-    await invalidate_for(
-        get_posts,
-        get_post,
-        post_with_comments,
-        user=user,
-        post_id=post_id,
-    )
+    await invalidate_tags(f"post:{post_id}")
     return post
 
 
@@ -125,13 +314,7 @@ async def delete_post(
     post = await service.delete_post(post_id, user.id)
     if not post:
         raise PostNotFoundException
-    await invalidate_for(
-        get_posts,
-        get_post,
-        post_with_comments,
-        user=user,
-        post_id=post_id,
-    )
+    await invalidate_tags(f"post:{post_id}")
     return {"message": "successfully deleted"}
 
 
@@ -141,11 +324,18 @@ async def delete_post(
 @cache(
     exp=300,
     namespace="post_with_comments",
-    key_params=["post_id"],
+    key_params=["post_id", "limit", "cursor"],
     response_model=PostComments,
+    raw=True,
+    tags=lambda _, kwargs: _post_tags(kwargs["post_id"]),
 )
-async def post_with_comments(post_id: UUID, service: PostServiceDep):
-    post = await service.get_post_with_comments(post_id)
+async def post_with_comments(
+    post_id: UUID,
+    service: PostServiceDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    post = await service.get_post_with_comments(post_id, limit=limit, cursor=cursor)
     if not post:
         raise PostNotFoundException
     return post
@@ -159,14 +349,29 @@ async def post_with_comments(post_id: UUID, service: PostServiceDep):
 async def add_tag_to_post(
     post_id: UUID, tag_id: UUID, service: TagServiceDep, _: GetCurrentUserDep
 ):
-    return await service.add_tag_to_post(tag_id=tag_id, post_id=post_id)
+    post_tag = await service.add_tag_to_post(tag_id=tag_id, post_id=post_id)
+    await invalidate_tags(f"tag:{tag_id}")
+    return post_tag
+
+
+@api_router.post(
+    "/{post_id}/add_tags",
+    status_code=status.HTTP_200_OK,
+    response_model=list[PostTagResult],
+)
+async def add_tags_to_post(
+    post_id: UUID, data: PostTagsUpdate, service: TagServiceDep, _: GetCurrentUserDep
+):
+    results = await service.add_tags_to_post(post_id=post_id, tag_ids=data.tag_ids)
+    await invalidate_tags(*(f"tag:{tag_id}" for tag_id in data.tag_ids))
+    return results
 
 
 @api_router.get(
     "/{post_id}/tags", status_code=status.HTTP_200_OK, response_model=list[TagResponse]
 )
 async def get_post_tags(post_id: UUID, service: PostServiceDep, _: GetCurrentUserDep):
-    post = await service.get_post(id=post_id)
+    post = await service.get_post(post_id=post_id)
     if not post:
         raise PostNotFoundException
     return await service.get_post_tags(post_id=post_id)
@@ -180,15 +385,50 @@ async def delete_tag_from_post(
     post_service: PostServiceDep,
     user: GetCurrentUserDep,
 ):
-    post = await post_service.get_post(id=post_id)
+    post = await post_service.get_post(post_id=post_id)
     if not post:
         raise PostNotFoundException
     if post.user_id != user.id:
         raise PostAccessDeniedException
     await tag_service.delete_tag_from_post(tag_id=tag_id, post_id=post_id)
+    await invalidate_tags(f"tag:{tag_id}")
     return {"message": "successfully deleted"}
 
 
+@api_router.delete(
+    "/{post_id}/delete_tags",
+    status_code=status.HTTP_200_OK,
+    response_model=list[PostTagResult],
+)
+async def delete_tags_from_post(
+    post_id: UUID,
+    tag_ids: Annotated[list[UUID], Query(min_length=1, max_length=MAX_BULK_TAGS)],
+    tag_service: TagServiceDep,
+    post_service: PostServiceDep,
+    user: GetCurrentUserDep,
+):
+    post = await post_service.get_post(post_id=post_id)
+    if not post:
+        raise PostNotFoundException
+    if post.user_id != user.id:
+        raise PostAccessDeniedException
+    results = await tag_service.delete_tags_from_post(post_id=post_id, tag_ids=tag_ids)
+    await invalidate_tags(*(f"tag:{tag_id}" for tag_id in tag_ids))
+    return results
+
+
+@cache(
+    exp=300,
+    namespace="post_likers",
+    key_params=["post_id", "limit", "cursor"],
+    tags=lambda _, kwargs: [f"post:{kwargs['post_id']}:activity"],
+)
+async def _post_likers_page(
+    post_id: UUID, limit: int, cursor: str | None, service: PostLikeService
+) -> dict:
+    return await service.get_likers(post_id=post_id, limit=limit, cursor=cursor)
+
+
 @api_router.post(
     "/{post_id}/like",
     response_model=PostLikeResponse,
@@ -197,7 +437,9 @@ async def delete_tag_from_post(
 async def like_post(
     post_id: UUID, service: PostLikeServiceDep, user: GetCurrentUserDep
 ):
-    return await service.like_post(post_id=post_id, user_id=user.id)
+    like = await service.like_post(post_id=post_id, user_id=user.id)
+    await invalidate_tags(f"post:{post_id}:activity")
+    return like
 
 
 @api_router.delete("/{post_id}/like", status_code=status.HTTP_204_NO_CONTENT)
@@ -205,20 +447,23 @@ async def unlike_post(
     post_id: UUID, service: PostLikeServiceDep, user: GetCurrentUserDep
 ):
     await service.unlike_post(post_id=post_id, user_id=user.id)
+    await invalidate_tags(f"post:{post_id}:activity")
 
 
 @api_router.get(
     "/{post_id}/likes",
     status_code=status.HTTP_200_OK,
-    response_model=list[UserLikedResponse],
-)
-@cache(
-    exp=300,
-    namespace="post_liked_users",
-    key_params=["post_id"],
-    response_model=UserLikedResponse,
+    response_model=LikersPage,
 )
 async def get_who_liked(
-    post_id: UUID, service: PostLikeServiceDep, _: GetCurrentUserDep
+    post_id: UUID,
+    service: PostLikeServiceDep,
+    _: GetCurrentUserDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
 ):
-    return await service.get_who_liked(post_id=post_id)
+    total = await service.get_likes_count(post_id=post_id)
+    page = await _post_likers_page(
+        post_id=post_id, limit=limit, cursor=cursor, service=service
+    )
+    return {**page, "total": total}
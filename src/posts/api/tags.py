@@ -3,9 +3,16 @@ from uuid import UUID
 from fastapi import APIRouter, status
 
 from src.auth.dependencies import RequireAdminDep
+from src.core.cache import invalidate_tags
 from src.posts.dependencies import TagServiceDep
 from src.posts.exceptions import TagNotFoundException
-from src.posts.schemas import TagCreate, TagResponse, TagUpdate
+from src.posts.schemas import (
+    TagCreate,
+    TagCreateResult,
+    TagResponse,
+    TagsCreate,
+    TagUpdate,
+)
 
 router = APIRouter()
 
@@ -27,7 +34,20 @@ async def get_tags(service: TagServiceDep, admin: RequireAdminDep):
 async def create_tag(
     new_tag: TagCreate, service: TagServiceDep, admin: RequireAdminDep
 ):
-    return await service.create_tag(new_tag)
+    tag = await service.create_tag(new_tag)
+    await invalidate_tags(f"slug:{tag.slug}")
+    return tag
+
+
+@router.post(
+    "/bulk", response_model=list[TagCreateResult], status_code=status.HTTP_200_OK
+)
+async def create_tags(
+    new_tags: TagsCreate, service: TagServiceDep, admin: RequireAdminDep
+):
+    results = await service.create_tags(new_tags)
+    await invalidate_tags(*(f"slug:{r['tag'].slug}" for r in results if r["tag"]))
+    return results
 
 
 @router.put("/{tag_id}", status_code=status.HTTP_200_OK)
@@ -37,6 +57,7 @@ async def update_tag(
     tag = await service.update_tag(tag_id=tag_id, data=new_data)
     if not tag:
         raise TagNotFoundException
+    await invalidate_tags(f"tag:{tag_id}", f"slug:{tag.slug}")
     return tag
 
 
@@ -45,4 +66,5 @@ async def delete_tag(tag_id: UUID, service: TagServiceDep, admin: RequireAdminDe
     tag = await service.delete_tag(tag_id=tag_id)
     if not tag:
         raise TagNotFoundException
+    await invalidate_tags(f"tag:{tag_id}")
     return {"message": "successfully deleted"}
@@ -0,0 +1,28 @@
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+
+from src.auth.dependencies import GetCurrentUserDep
+from src.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.posts.api.posts import user_posts_page
+from src.posts.dependencies import PostLikeServiceDep, PostServiceDep
+from src.posts.schemas import PostPage
+
+router = APIRouter()
+
+
+@router.get("/{user_id}/posts", response_model=PostPage)
+async def get_user_posts(
+    user_id: UUID,
+    service: PostServiceDep,
+    like_service: PostLikeServiceDep,
+    user: GetCurrentUserDep,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+):
+    page = await user_posts_page(
+        user_id=user_id, limit=limit, cursor=cursor, service=service
+    )
+    items = await like_service.with_is_liked(user.id, page["items"])
+    return {"items": items, "next_cursor": page["next_cursor"]}
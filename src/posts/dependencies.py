@@ -3,6 +3,14 @@ from typing import Annotated
 from fastapi import Depends
 
 from src.db import AsyncSession, get_session
+from src.posts.hot import HotPosts, get_hot_posts
+from src.posts.like_batcher import (
+    LikeBatcher,
+    get_comment_like_batcher,
+    get_post_like_batcher,
+)
+from src.posts.like_buffer import LikeBuffer, get_like_buffer
+from src.posts.likes import LikeStore, get_like_store
 from src.posts.repository import (
     CommentLikeRepository,
     CommentRepository,
@@ -39,8 +47,9 @@ def get_comment_repository(
 
 def get_comment_service(
     repo: Annotated[CommentRepository, Depends(get_comment_repository)],
+    hot: Annotated[HotPosts, Depends(get_hot_posts)],
 ) -> CommentService:
-    return CommentService(repo=repo)
+    return CommentService(repo=repo, hot=hot)
 
 
 def get_tag_repository(
@@ -63,8 +72,14 @@ def get_post_like_repository(
 
 def get_post_like_service(
     repository: Annotated[PostLikeRepository, Depends(get_post_like_repository)],
+    likes: Annotated[LikeStore, Depends(get_like_store)],
+    hot: Annotated[HotPosts, Depends(get_hot_posts)],
+    buffer: Annotated[LikeBuffer | None, Depends(get_like_buffer)],
+    batcher: Annotated[LikeBatcher | None, Depends(get_post_like_batcher)],
 ) -> PostLikeService:
-    return PostLikeService(repo=repository)
+    return PostLikeService(
+        repo=repository, likes=likes, hot=hot, buffer=buffer, batcher=batcher
+    )
 
 
 def get_comment_like_repository(
@@ -75,8 +90,10 @@ def get_comment_like_repository(
 
 def get_comment_like_service(
     repository: Annotated[CommentLikeRepository, Depends(get_comment_like_repository)],
+    buffer: Annotated[LikeBuffer | None, Depends(get_like_buffer)],
+    batcher: Annotated[LikeBatcher | None, Depends(get_comment_like_batcher)],
 ) -> CommentLikeService:
-    return CommentLikeService(repo=repository)
+    return CommentLikeService(repo=repository, buffer=buffer, batcher=batcher)
 
 
 PostServiceDep = Annotated[PostService, Depends(get_post_service)]
@@ -84,3 +101,4 @@ CommentServiceDep = Annotated[CommentService, Depends(get_comment_service)]
 TagServiceDep = Annotated[TagService, Depends(get_tag_service)]
 PostLikeServiceDep = Annotated[PostLikeService, Depends(get_post_like_service)]
 CommentLikeServiceDep = Annotated[CommentLikeService, Depends(get_comment_like_service)]
+HotPostsDep = Annotated[HotPosts, Depends(get_hot_posts)]
@@ -80,3 +80,10 @@ class CommentLikeNotFoundException(BaseAPIException):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="You haven't liked this comment",
         )
+
+
+class InvalidCursorException(BaseAPIException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor"
+        )
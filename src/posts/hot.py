@@ -0,0 +1,92 @@
+import time
+from uuid import UUID
+
+from redis.asyncio import Redis, RedisError
+
+from src.core.cache import get_redis
+from src.core.logging_conf import logger
+
+HOT_KEY = "hot:posts"
+EPOCH_KEY = "hot:posts:epoch"
+
+# An interaction's weight halves every HALF_LIFE seconds.
+HALF_LIFE = 86400
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+
+# Rebuilds count interactions from this far back.
+REBUILD_WINDOW = 7 * 86400
+MAX_HOT_POSTS = 10_000
+
+# Instead of decaying every score over time, each new interaction is worth
+# 2 ** ((now - epoch) / HALF_LIFE): relative order is the same as with decay
+# and a bump is a single ZINCRBY. The rebuild job moves the epoch forward
+# long before the weights could overflow a double.
+#
+# KEYS: zset, epoch
+# ARGV: weight, now, half life, post id, max size
+_BUMP = """
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+    epoch = tonumber(ARGV[2])
+    redis.call('SET', KEYS[2], ARGV[2])
+end
+local growth = 2 ^ ((tonumber(ARGV[2]) - epoch) / tonumber(ARGV[3]))
+redis.call('ZINCRBY', KEYS[1], tonumber(ARGV[1]) * growth, ARGV[4])
+local max_size = tonumber(ARGV[5])
+if redis.call('ZCARD', KEYS[1]) > max_size then
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -max_size - 1)
+end
+"""
+
+
+class HotPosts:
+    """Time-decayed "hot" ranking of posts in a Redis sorted set.
+
+    Likes and new comments bump their post as they happen; unlikes and
+    deleted comments are left to the next `rebuild`, which recomputes the
+    scores from Postgres (`python -m src.posts.jobs hot`).
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._bump = redis.register_script(_BUMP)
+
+    async def bump(self, post_id: UUID, weight: float) -> None:
+        try:
+            await self._bump(
+                keys=[HOT_KEY, EPOCH_KEY],
+                args=[weight, time.time(), HALF_LIFE, str(post_id), MAX_HOT_POSTS],
+            )
+        except RedisError:
+            logger.warning("Failed to bump hot score of post %s", post_id)
+
+    async def top(self, limit: int, offset: int = 0) -> list[UUID]:
+        try:
+            ids = await self._redis.zrevrange(HOT_KEY, offset, offset + limit - 1)
+        except RedisError:
+            logger.warning("Failed to read hot posts")
+            return []
+        return [UUID(post_id.decode()) for post_id in ids]
+
+    async def rebuild(self, scores: list[tuple[UUID, float]], epoch: float) -> None:
+        """Replace the ranking with `scores`, computed against `epoch`. The
+        new set is built aside and swapped in together with its epoch."""
+        staging = f"{HOT_KEY}:rebuild"
+        async with self._redis.pipeline(transaction=False) as pipe:
+            await pipe.delete(staging)
+            for start in range(0, len(scores), 1000):
+                chunk = scores[start : start + 1000]
+                await pipe.zadd(staging, {str(p): score for p, score in chunk})
+            await pipe.execute()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            if scores:
+                await pipe.rename(staging, HOT_KEY)
+            else:
+                await pipe.delete(HOT_KEY)
+            await pipe.set(EPOCH_KEY, epoch)
+            await pipe.execute()
+
+
+def get_hot_posts() -> HotPosts:
+    return HotPosts(get_redis())
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import socket
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from src.core.cache import get_redis, redis_manager
+from src.core.logging_conf import logger
+from src.core.metrics import metrics
+from src.db import async_session_factory
+from src.posts import hot
+from src.posts.like_buffer import LikeBuffer
+from src.posts.repository import (
+    CommentLikeRepository,
+    CommentRepository,
+    PostLikeRepository,
+    PostRepository,
+)
+
+LIKE_FLUSH_BATCH = 500
+LIKE_FLUSH_INTERVAL = 1.0
+
+LIKE_REPOSITORIES = {"post": PostLikeRepository, "comment": CommentLikeRepository}
+
+
+async def reconcile_counters() -> None:
+    """Recount denormalized counters from the source tables and fix any drift
+    left behind by cascaded deletes or failed writes.
+
+    Run periodically with `python -m src.posts.jobs reconcile`.
+    """
+    async with async_session_factory() as session:
+        fixed_posts = await PostRepository(session).reconcile_counters()
+        fixed_comments = await CommentRepository(session).reconcile_counters()
+    logger.info(
+        "Reconciled counters: %d posts, %d comments fixed",
+        len(fixed_posts),
+        len(fixed_comments),
+    )
+
+
+async def _apply_one_by_one(repository, kind: str, change: dict) -> None:
+    """Retry a batch that violated a constraint one change at a time, and
+    drop the changes that still do (e.g. likes by a deleted user) so the
+    rest of the batch isn't replayed forever."""
+    singles = [([row], []) for row in change["liked"]]
+    singles += [([], [pair]) for pair in change["unliked"]]
+    for liked, unliked in singles:
+        try:
+            await repository.apply_like_changes(liked, unliked)
+        except IntegrityError:
+            await repository.session.rollback()
+            if liked:
+                pair = (liked[0][f"{kind}_id"], liked[0]["user_id"])
+            else:
+                pair = unliked[0][::-1]
+            metrics.inc("like_flush_dropped_total", kind=kind)
+            logger.warning(
+                "Dropped buffered %s like change %s for user %s (entries %s)",
+                kind,
+                pair[0],
+                pair[1],
+                ", ".join(change["sources"].get(pair, ())),
+                exc_info=True,
+            )
+
+
+async def flush_likes(buffer: LikeBuffer, consumer: str) -> int:
+    """Persist one batch of buffered likes; returns the number of stream
+    entries handled. The batch is acknowledged only after it committed."""
+    entry_ids, keys, changes = await buffer.read_changes(consumer, LIKE_FLUSH_BATCH)
+    if not entry_ids:
+        return 0
+    async with async_session_factory() as session:
+        for kind, change in changes.items():
+            repository = LIKE_REPOSITORIES[kind](session)
+            try:
+                await repository.apply_like_changes(change["liked"], change["unliked"])
+            except IntegrityError:
+                await session.rollback()
+                await _apply_one_by_one(repository, kind, change)
+    await buffer.ack(entry_ids, keys)
+    return len(entry_ids)
+
+
+async def run_like_flusher() -> None:
+    """Drain the like buffer until cancelled. Started by the app lifespan when
+    LIKES_WRITE_BEHIND is on; every worker joins the same consumer group."""
+    buffer = LikeBuffer(get_redis())
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    group_ready = False
+    while True:
+        try:
+            if not group_ready:
+                await buffer.ensure_group()
+                group_ready = True
+            flushed = await flush_likes(buffer, consumer)
+        except Exception:
+            # The batch stays pending and is retried or reclaimed.
+            logger.exception("Failed to flush buffered likes")
+            group_ready = False
+            flushed = 0
+        if flushed < LIKE_FLUSH_BATCH:
+            await asyncio.sleep(LIKE_FLUSH_INTERVAL)
+
+
+async def rebuild_hot_posts() -> None:
+    """Recompute the hot ranking from the last REBUILD_WINDOW of likes and
+    comments, and move the score epoch to now.
+
+    Run periodically with `python -m src.posts.jobs hot`.
+    """
+    epoch = time.time()
+    since = datetime.now(timezone.utc) - timedelta(seconds=hot.REBUILD_WINDOW)
+    async with async_session_factory() as session:
+        scores = await PostRepository(session).get_hot_scores(
+            since=since,
+            epoch=epoch,
+            half_life=hot.HALF_LIFE,
+            like_weight=hot.LIKE_WEIGHT,
+            comment_weight=hot.COMMENT_WEIGHT,
+            limit=hot.MAX_HOT_POSTS,
+        )
+    await hot.HotPosts(get_redis()).rebuild(
+        [(row.post_id, row.score) for row in scores], epoch
+    )
+    logger.info("Rebuilt hot posts: %d ranked", len(scores))
+
+
+JOBS = {"reconcile": reconcile_counters, "hot": rebuild_hot_posts}
+
+
+async def run(job: str) -> None:
+    await redis_manager.initialize()
+    try:
+        await JOBS[job]()
+    finally:
+        await redis_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(sys.argv[1] if len(sys.argv) > 1 else "reconcile"))
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError
+
+from src.conf import settings
+from src.core.exceptions import RepositoryError
+from src.core.logging_conf import logger
+from src.core.metrics import metrics
+from src.core.utils import raise_constraint_error
+from src.db import async_session_factory
+from src.posts.repository import CommentLikeRepository, PostLikeRepository
+
+MAX_BATCH_DELAY = 0.005
+MAX_BATCH_SIZE = 500
+
+LIKE = "like"
+UNLIKE = "unlike"
+
+
+class LikeBatcher:
+    """Coalesces like/unlike calls from concurrent requests for up to
+    MAX_BATCH_DELAY and writes them with one multi-row INSERT and DELETE in a
+    single transaction, resolving every caller with its own row.
+
+    A batch holds at most one intent per (user, target); a repeat waits for
+    the next batch so a quick like/unlike keeps its order. Batches are
+    written one at a time, each after the previous one has resolved.
+    """
+
+    def __init__(self, repository_cls, kind: str) -> None:
+        self._repository_cls = repository_cls
+        self._kind = kind
+        self._target_key = f"{kind}_id"
+        self._pending: list[tuple[str, UUID, UUID, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._last_flush: asyncio.Task | None = None
+
+    async def like(self, target_id: UUID, user_id: UUID):
+        """Return the new like, or None if it already existed.
+
+        Raises LookupError if the target does not exist."""
+        return await self._submit(LIKE, target_id, user_id)
+
+    async def unlike(self, target_id: UUID, user_id: UUID):
+        """Return the removed like, or None if there was none."""
+        return await self._submit(UNLIKE, target_id, user_id)
+
+    async def _submit(self, op: str, target_id: UUID, user_id: UUID):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((op, target_id, user_id, future))
+        if len(self._pending) >= MAX_BATCH_SIZE:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(MAX_BATCH_DELAY, self._flush_pending)
+        return await future
+
+    def _flush_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, deferred, seen = [], [], set()
+        for intent in self._pending:
+            _, target_id, user_id, _ = intent
+            if (user_id, target_id) in seen:
+                deferred.append(intent)
+            else:
+                seen.add((user_id, target_id))
+                batch.append(intent)
+        self._pending = deferred
+        if deferred:
+            self._timer = asyncio.get_running_loop().call_later(
+                MAX_BATCH_DELAY, self._flush_pending
+            )
+
+        if batch:
+            self._last_flush = asyncio.create_task(self._flush(batch, self._last_flush))
+
+    async def _flush(self, batch: list, previous: asyncio.Task | None) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        started = time.perf_counter()
+        try:
+            result = await self._write(batch)
+        except Exception:
+            logger.warning(
+                "Failed to write a batch of %d likes, retrying one by one",
+                len(batch),
+                exc_info=True,
+            )
+            await self._flush_each(batch)
+            return
+        latency = time.perf_counter() - started
+        metrics.observe("like_batch_size", len(batch), kind=self._kind)
+        metrics.observe("like_batch_flush_seconds", latency, kind=self._kind)
+        logger.debug("Wrote %d likes in %.1f ms", len(batch), latency * 1000)
+        self._resolve(batch, *result)
+
+    async def _flush_each(self, batch: list) -> None:
+        # One bad intent (e.g. a user deleted mid-request) must not fail the
+        # others, so each caller gets its own result or error.
+        for intent in batch:
+            try:
+                result = await self._write([intent])
+            except Exception as e:
+                logger.exception("Failed to write a %s %s", self._kind, intent[0])
+                if isinstance(e, IntegrityError):
+                    e = _constraint_error(e)
+                if not intent[-1].done():
+                    intent[-1].set_exception(e)
+            else:
+                self._resolve([intent], *result)
+
+    async def _write(self, batch: list):
+        liked = [
+            {self._target_key: target_id, "user_id": user_id}
+            for op, target_id, user_id, _ in batch
+            if op == LIKE
+        ]
+        unliked = [
+            (user_id, target_id) for op, target_id, user_id, _ in batch if op == UNLIKE
+        ]
+        async with async_session_factory() as session:
+            return await self._repository_cls(session).apply_like_changes(
+                liked, unliked
+            )
+
+    def _resolve(self, batch: list, inserted, deleted, missing) -> None:
+        rows = {
+            LIKE: {(r.user_id, getattr(r, self._target_key)): r for r in inserted},
+            UNLIKE: {(r.user_id, getattr(r, self._target_key)): r for r in deleted},
+        }
+        for op, target_id, user_id, future in batch:
+            if future.done():
+                continue
+            if op == LIKE and target_id in missing:
+                future.set_exception(LookupError(target_id))
+            else:
+                future.set_result(rows[op].get((user_id, target_id)))
+
+
+def _constraint_error(e: IntegrityError) -> Exception:
+    try:
+        raise_constraint_error(e)
+    except RepositoryError as mapped:
+        return mapped
+    return e
+
+
+post_like_batcher = LikeBatcher(PostLikeRepository, "post")
+comment_like_batcher = LikeBatcher(CommentLikeRepository, "comment")
+
+
+def get_post_like_batcher() -> LikeBatcher | None:
+    return post_like_batcher if settings.LIKES_MICRO_BATCH else None
+
+
+def get_comment_like_batcher() -> LikeBatcher | None:
+    return comment_like_batcher if settings.LIKES_MICRO_BATCH else None
@@ -0,0 +1,222 @@
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+from uuid import UUID, uuid4
+
+from redis.asyncio import Redis, ResponseError
+
+from src.conf import settings
+from src.core.cache import get_redis
+
+STREAM = "likes:changes"
+GROUP = "likes:flushers"
+
+# Entries a dead consumer left unacknowledged are reclaimed after this long.
+CLAIM_IDLE_MS = 60_000
+
+# Keys only expire once their changes reached Postgres; until then they are
+# the source of truth and must outlive any TTL.
+FLUSHED_TTL = 86400
+
+NEEDS_SEED = -1
+
+UNLIKED = "0"
+
+# KEYS: member, counter, stream
+# ARGV: new member value, seeded member value, seeded count, kind, target, user
+#
+# Member values are "0" or "1:<like id>:<created_at>", so the flusher can
+# insert the exact row the client was given.
+_TOGGLE = """
+local member = redis.call('GET', KEYS[1]) or ARGV[2]
+local has_count = redis.call('EXISTS', KEYS[2]) == 1
+if member == '' or (not has_count and ARGV[3] == '') then
+    return -1
+end
+if string.sub(member, 1, 1) == string.sub(ARGV[1], 1, 1) then
+    return 0
+end
+if not has_count then
+    redis.call('SET', KEYS[2], ARGV[3])
+end
+if string.sub(ARGV[1], 1, 1) == '1' then
+    redis.call('INCR', KEYS[2])
+else
+    redis.call('DECR', KEYS[2])
+end
+redis.call('PERSIST', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('XADD', KEYS[3], '*', 'kind', ARGV[4], 'target', ARGV[5], 'user', ARGV[6])
+return 1
+"""
+
+
+def _member_key(kind: str, target_id: UUID | str, user_id: UUID | str) -> str:
+    return f"likes:{kind}:{target_id}:user:{user_id}"
+
+
+def _count_key(kind: str, target_id: UUID | str) -> str:
+    return f"likes:{kind}:{target_id}:count"
+
+
+class LikeBuffer:
+    """Write-behind buffer for post and comment likes.
+
+    A like or unlike flips the user's membership, bumps the counter and
+    appends to a stream in one Lua call; `src.posts.jobs.flush_likes` drains
+    the stream into Postgres in batches. Entries are acknowledged only after
+    the transaction commits, and stale pending entries are reclaimed with
+    XAUTOCLAIM, so a crashed flusher's batch is replayed. Replays are safe:
+    the flusher applies the current membership, not the recorded operation.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._toggle = redis.register_script(_TOGGLE)
+
+    async def like(
+        self,
+        kind: str,
+        target_id: UUID,
+        user_id: UUID,
+        load_seed: Callable[[], Awaitable[tuple[bool, int] | None]],
+    ) -> dict | None:
+        """Return the new like, or None if the user already liked the target.
+
+        Raises LookupError if the target does not exist."""
+        like = {
+            "id": uuid4(),
+            f"{kind}_id": target_id,
+            "user_id": user_id,
+            "created_at": datetime.now(timezone.utc),
+        }
+        value = f"1:{like['id']}:{like['created_at'].isoformat()}"
+        changed = await self._set(kind, target_id, user_id, value, load_seed)
+        return like if changed else None
+
+    async def unlike(
+        self,
+        kind: str,
+        target_id: UUID,
+        user_id: UUID,
+        load_seed: Callable[[], Awaitable[tuple[bool, int] | None]],
+    ) -> bool:
+        """Return False if there was no like to remove.
+
+        Raises LookupError if the target does not exist."""
+        return await self._set(kind, target_id, user_id, UNLIKED, load_seed)
+
+    async def _set(self, kind, target_id, user_id, value, load_seed) -> bool:
+        keys = [
+            _member_key(kind, target_id, user_id),
+            _count_key(kind, target_id),
+            STREAM,
+        ]
+        ids = [kind, str(target_id), str(user_id)]
+        result = await self._toggle(keys=keys, args=[value, "", "", *ids])
+        if result == NEEDS_SEED:
+            seed = await load_seed()
+            if seed is None:
+                raise LookupError(target_id)
+            liked, count = seed
+            member = "1" if liked else UNLIKED
+            result = await self._toggle(keys=keys, args=[value, member, count, *ids])
+        return result == 1
+
+    async def peek(
+        self, kind: str, user_id: UUID, target_ids: list[UUID]
+    ) -> tuple[dict[UUID, int], dict[UUID, bool]]:
+        """Buffered counts and the user's membership for `target_ids`. Targets
+        Redis knows nothing about are left out, their database values stand."""
+        if not target_ids:
+            return {}, {}
+        keys = [_count_key(kind, t) for t in target_ids]
+        keys += [_member_key(kind, t, user_id) for t in target_ids]
+        values = await self._redis.mget(keys)
+        counts, members = values[: len(target_ids)], values[len(target_ids) :]
+        return (
+            {t: int(c) for t, c in zip(target_ids, counts) if c is not None},
+            {t: m[:1] == b"1" for t, m in zip(target_ids, members) if m is not None},
+        )
+
+    async def count(self, kind: str, target_id: UUID) -> int | None:
+        """Buffered like count of `target_id`, or None if Redis has none."""
+        count = await self._redis.get(_count_key(kind, target_id))
+        return int(count) if count is not None else None
+
+    async def ensure_group(self) -> None:
+        try:
+            await self._redis.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_changes(
+        self, consumer: str, count: int
+    ) -> tuple[list, list[str], dict]:
+        """Claim a batch of stream entries and resolve them into the rows to
+        insert and the (user_id, target_id) pairs to delete, per kind, along
+        with the entry ids behind each (target_id, user_id) pair.
+
+        Also returns the entry ids and the keys involved, for `ack`."""
+        _, entries, *_ = await self._redis.xautoclaim(
+            STREAM, GROUP, consumer, min_idle_time=CLAIM_IDLE_MS, count=count
+        )
+        if not entries:
+            response = await self._redis.xreadgroup(
+                GROUP, consumer, {STREAM: ">"}, count=count
+            )
+            entries = response[0][1] if response else []
+        if not entries:
+            return [], [], {}
+
+        sources: dict[tuple[str, str, str], list[str]] = {}
+        for entry_id, f in entries:
+            pair = (f[b"kind"].decode(), f[b"target"].decode(), f[b"user"].decode())
+            sources.setdefault(pair, []).append(entry_id.decode())
+        pairs = sorted(sources)
+        member_keys = [_member_key(*pair) for pair in pairs]
+        members = await self._redis.mget(member_keys)
+
+        changes: dict[str, dict[str, list]] = {}
+        for (kind, target, user), member in zip(pairs, members):
+            if member is None:
+                continue
+            change = changes.setdefault(
+                kind, {"liked": [], "unliked": [], "sources": {}}
+            )
+            target_id, user_id = UUID(target), UUID(user)
+            change["sources"][(target_id, user_id)] = sources[(kind, target, user)]
+            if member[:1] == b"1":
+                _, like_id, created_at = member.decode().split(":", 2)
+                change["liked"].append(
+                    {
+                        "id": UUID(like_id),
+                        f"{kind}_id": target_id,
+                        "user_id": user_id,
+                        "created_at": datetime.fromisoformat(created_at),
+                    }
+                )
+            else:
+                change["unliked"].append((user_id, target_id))
+
+        count_keys = {_count_key(kind, target) for kind, target, _ in pairs}
+        entry_ids = [entry_id for entry_id, _ in entries]
+        return entry_ids, [*member_keys, *count_keys], changes
+
+    async def ack(self, entry_ids: list, keys: list[str]) -> None:
+        """Acknowledge a committed batch and let its keys expire.
+
+        A change buffered after `read_changes` loses its PERSIST here, which
+        is harmless as long as the flusher catches up within FLUSHED_TTL."""
+        async with self._redis.pipeline(transaction=False) as pipe:
+            await pipe.xack(STREAM, GROUP, *entry_ids)
+            await pipe.xdel(STREAM, *entry_ids)
+            for key in keys:
+                await pipe.expire(key, FLUSHED_TTL)
+            await pipe.execute()
+
+
+def get_like_buffer() -> LikeBuffer | None:
+    if not settings.LIKES_WRITE_BEHIND:
+        return None
+    return LikeBuffer(get_redis())
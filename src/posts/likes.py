@@ -0,0 +1,85 @@
+from contextlib import suppress
+from typing import Iterable
+from uuid import UUID
+
+from redis.asyncio import Redis, RedisError
+
+from src.core.cache import get_redis
+from src.core.logging_conf import logger
+
+LIKED_POSTS_TTL = 3600
+
+# Present in every warmed set, so an empty set still reads as "known".
+WARM_MARKER = ""
+
+# Only touch sets that are already warm: creating a partial set here would
+# make every other post read as "not liked".
+_UPDATE_IF_WARM = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call(ARGV[1], KEYS[1], ARGV[2])
+end
+return -1
+"""
+
+
+class LikeStore:
+    """Per-user set of liked post ids in Redis.
+
+    Lets a shared, viewer-independent post body be overlaid with `is_liked`
+    for any number of posts in a single SMISMEMBER.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._update_if_warm = redis.register_script(_UPDATE_IF_WARM)
+
+    @staticmethod
+    def _key(user_id: UUID) -> str:
+        return f"likes:user:{user_id}:posts"
+
+    async def liked_post_ids(
+        self, user_id: UUID, post_ids: list[UUID]
+    ) -> set[UUID] | None:
+        """Return which of `post_ids` the user liked, or None if the user's set
+        is not warm (or Redis is unavailable) and the caller must ask the DB."""
+        try:
+            flags = await self._redis.smismember(
+                self._key(user_id), [WARM_MARKER, *map(str, post_ids)]
+            )
+        except RedisError:
+            logger.warning("Liked posts lookup failed for user %s", user_id)
+            return None
+        if not flags[0]:
+            return None
+        return {post_id for post_id, flag in zip(post_ids, flags[1:]) if flag}
+
+    async def warm(self, user_id: UUID, liked_post_ids: Iterable[UUID]) -> None:
+        key = self._key(user_id)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                await pipe.delete(key)
+                await pipe.sadd(key, WARM_MARKER, *map(str, liked_post_ids))
+                await pipe.expire(key, LIKED_POSTS_TTL)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Failed to warm liked posts for user %s", user_id)
+
+    async def add(self, user_id: UUID, post_id: UUID) -> None:
+        await self._update(user_id, "SADD", post_id)
+
+    async def remove(self, user_id: UUID, post_id: UUID) -> None:
+        await self._update(user_id, "SREM", post_id)
+
+    async def _update(self, user_id: UUID, command: str, post_id: UUID) -> None:
+        key = self._key(user_id)
+        try:
+            await self._update_if_warm(keys=[key], args=[command, str(post_id)])
+        except RedisError:
+            # A set we failed to update must not keep answering
+            logger.warning("Failed to update liked posts for user %s", user_id)
+            with suppress(RedisError):
+                await self._redis.delete(key)
+
+
+def get_like_store() -> LikeStore:
+    return LikeStore(get_redis())
@@ -2,7 +2,16 @@ from typing import TYPE_CHECKING
 from uuid import UUID, uuid4
 
 from sqlalchemy import UUID as PG_UUID
-from sqlalchemy import ForeignKey, Index, String, Text, UniqueConstraint
+from sqlalchemy import (
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.db import Base, CreatedAt, UpdatedAt
@@ -10,6 +19,8 @@ from src.db import Base, CreatedAt, UpdatedAt
 if TYPE_CHECKING:
     from src.users.models import User
 
+SEARCH_CONFIG = "english"
+
 
 class Post(Base):
     __tablename__ = "posts"
@@ -24,6 +35,22 @@ class Post(Base):
     )
     title: Mapped[str] = mapped_column(String(), nullable=False)
     content: Mapped[str] = mapped_column(Text(), nullable=True)
+    likes_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    comments_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    # Title matches outrank content matches. Deferred: only search reads it.
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR(),
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     created_at: Mapped[CreatedAt]
     updated_at: Mapped[UpdatedAt]
@@ -39,7 +66,11 @@ class Post(Base):
         back_populates="post", cascade="all, delete-orphan"
     )
 
-    __table_args__ = (Index("ix_posts_user_created", "user_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_posts_user_created", "user_id", "created_at", "id"),
+        Index("ix_posts_created_id", "created_at", "id"),
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
 class Tag(Base):
@@ -75,6 +106,9 @@ class PostTag(Base):
         primary_key=True,
     )
 
+    # The primary key leads with post_id; tag listings need tag_id first.
+    __table_args__ = (Index("ix_post_tags_tag_post", "tag_id", "post_id"),)
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -98,6 +132,16 @@ class Comment(Base):
         nullable=True,
     )
     content: Mapped[str] = mapped_column(Text(), nullable=False)
+    likes_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    replies_count: Mapped[int] = mapped_column(
+        Integer(), nullable=False, default=0, server_default="0"
+    )
+    # Materialized path of "/"-joined segments from the root comment down,
+    # compared bytewise so a subtree is a single index range.
+    path: Mapped[str] = mapped_column(String(collation="C"), nullable=False)
+    depth: Mapped[int] = mapped_column(Integer(), nullable=False, default=0)
 
     created_at: Mapped[CreatedAt]
     updated_at: Mapped[UpdatedAt]
@@ -117,7 +161,20 @@ class Comment(Base):
         back_populates="parent", cascade="all, delete-orphan"
     )
 
-    __table_args__ = (Index("ix_comments_post_created", "post_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_comments_post_created", "post_id", "created_at", "id"),
+        Index("ix_comments_post_likes", "post_id", "likes_count", "created_at", "id"),
+        Index("ix_comments_user_created", "user_id", "created_at", "id"),
+        Index("ix_comments_parent_created", "parent_id", "created_at", "id"),
+        Index("ix_comments_path", "path"),
+        Index(
+            "ix_comments_post_roots",
+            "post_id",
+            "created_at",
+            "id",
+            postgresql_where=parent_id.is_(None),
+        ),
+    )
 
 
 class PostLike(Base):
@@ -143,7 +200,7 @@ class PostLike(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "post_id", name="uq_user_post_like"),
-        Index("ix_post_likes_post_id", "post_id"),
+        Index("ix_post_likes_post_created", "post_id", "created_at", "id"),
     )
 
 
@@ -170,5 +227,5 @@ class CommentLike(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "comment_id", name="uq_user_comment_like"),
-        Index("ix_comment_likes_comment_id", "comment_id"),
+        Index("ix_comment_likes_comment_created", "comment_id", "created_at", "id"),
     )
@@ -1,116 +1,350 @@
-from uuid import UUID
-
-import asyncpg
-from sqlalchemy import delete, exists, func, insert, select
+import html
+from collections import Counter
+from datetime import datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import (
+    BigInteger,
+    Float,
+    and_,
+    any_,
+    bindparam,
+    cast,
+    delete,
+    exists,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import aliased, selectinload
 
-from src.core.utils import CRUDRepository
+from src.core.exceptions import ForeignKeyConstraintError
+from src.core.pagination import keyset_after
+from src.core.utils import CRUDRepository, raise_constraint_error
 from src.posts.exceptions import (
+    CommentNotFoundException,
     PostNotFoundException,
     PostTagNotFoundException,
     PostTagUniqueViolationException,
     TagNotFoundException,
 )
-from src.posts.models import Comment, CommentLike, Post, PostLike, PostTag, Tag
+from src.posts.models import (
+    SEARCH_CONFIG,
+    Comment,
+    CommentLike,
+    Post,
+    PostLike,
+    PostTag,
+    Tag,
+)
+from src.posts.schemas import CommentSort
 from src.users.models import User
 
+PATH_SEPARATOR = "/"
 
-class PostRepository(CRUDRepository):
-    model = Post
+# ts_headline copies the content verbatim, markup included, so it marks
+# matches with control characters; highlight_snippet escapes the result and
+# only then turns those into <mark> tags.
+HEADLINE_START = "\x02"
+HEADLINE_STOP = "\x03"
+HEADLINE_OPTIONS = (
+    f"StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, MaxWords=35, MinWords=15"
+)
 
-    async def get_post(self, post_id: UUID, user_id: UUID):
-        post_likes = (
-            select(func.count(PostLike.id))
-            .where(PostLike.post_id == post_id)
-            .scalar_subquery()
-        )
-        is_liked = exists().where(
-            PostLike.post_id == post_id, PostLike.user_id == user_id
-        )
-        comments_count = (
-            select(func.count(Comment.id))
-            .where(Comment.post_id == post_id)
-            .scalar_subquery()
+
+def highlight_snippet(snippet: str) -> str:
+    return (
+        html.escape(snippet)
+        .replace(HEADLINE_START, "<mark>")
+        .replace(HEADLINE_STOP, "</mark>")
+    )
+
+
+def _path_segment(comment_id: UUID):
+    # Creation time in microseconds as fixed-width hex, then the id, so sibling
+    # segments sort chronologically. now() is the same transaction timestamp
+    # the created_at default uses; migration 9e0b3d7a4f16 backfills alike.
+    micros = cast(func.extract("epoch", func.now()) * 1_000_000, BigInteger)
+    return func.concat(func.lpad(func.to_hex(micros), 14, "0"), comment_id.hex)
+
+
+def comment_path_ids(path: str) -> list[UUID]:
+    """Ids along a materialized path: the root first, the comment itself last."""
+    return [UUID(segment[-32:]) for segment in path.split(PATH_SEPARATOR)]
+
+
+def _subtree_of(root_path):
+    # Descendants are "<root>/...", and "/" sorts right below "0", the smallest
+    # character a segment can start with; with the "C" collation the subtree
+    # is exactly the range [root, root || "0").
+    return and_(Comment.path >= root_path, Comment.path < root_path + "0")
+
+
+def _shift_counters(model, row_id: UUID, **deltas: int):
+    # Counters are bookkeeping, not edits: keep updated_at untouched.
+    values = {name: getattr(model, name) + delta for name, delta in deltas.items()}
+    return (
+        update(model)
+        .where(model.id == row_id)
+        .values(**values, updated_at=model.updated_at)
+    )
+
+
+async def _apply_like_changes(
+    session, target_column, target_model, liked: list[dict], unliked: list[tuple]
+) -> tuple[list, list, set[UUID]]:
+    """Apply a batch of likes and (user_id, target_id) unlikes in one
+    transaction, with one multi-row statement each.
+
+    Idempotent so a replayed batch is harmless: existing likes are skipped,
+    missing ones aren't deleted twice, and counters move by the rows that
+    actually changed. Likes on missing targets are dropped. Returns the
+    inserted rows, the deleted rows and the missing target ids.
+    """
+    model = target_column.class_
+    inserted, deleted, missing = [], [], set()
+    if liked:
+        target_ids = {row[target_column.key] for row in liked}
+        existing = set(
+            (
+                await session.execute(
+                    select(target_model.id).where(target_model.id.in_(target_ids))
+                )
+            ).scalars()
         )
-        query = (
-            select(
-                Post,
-                post_likes.label("likes_count"),
-                is_liked.label("is_liked"),
-                comments_count.label("comments_count"),
+        missing = target_ids - existing
+        rows = [row for row in liked if row[target_column.key] in existing]
+        if rows:
+            stmt = pg_insert(model).values(rows).on_conflict_do_nothing()
+            inserted = (await session.execute(stmt.returning(model))).scalars().all()
+    if unliked:
+        stmt = delete(model).where(tuple_(model.user_id, target_column).in_(unliked))
+        deleted = (await session.execute(stmt.returning(model))).scalars().all()
+
+    deltas = Counter(getattr(row, target_column.key) for row in inserted)
+    deltas.subtract(getattr(row, target_column.key) for row in deleted)
+    # A stable order keeps concurrent writers from deadlocking on counters.
+    for target_id, delta in sorted(deltas.items()):
+        if delta:
+            await session.execute(
+                _shift_counters(target_model, target_id, likes_count=delta)
             )
-            .where(Post.id == post_id)
-            .options(selectinload(Post.author))
+    await session.commit()
+    return inserted, deleted, missing
+
+
+async def _get_likers(
+    session, target_column, target_id: UUID, limit: int, after: tuple | None
+):
+    """Newest likes first, served by the (target, created_at, id) index."""
+    model = target_column.class_
+    query = (
+        select(
+            User.id,
+            User.username,
+            User.email,
+            model.created_at.label("liked_at"),
+            model.id.label("like_id"),
         )
-        result = await self.session.execute(query)
-        row = result.one_or_none()
+        .join(model, model.user_id == User.id)
+        .where(target_column == target_id)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(keyset_after((model.created_at, model.id), after))
+    results = await session.execute(query)
+    return results.mappings().all()
 
-        if not row:
-            return None
 
-        post, likes_count, is_liked, comments_count = row
+async def _get_likes_count(session, target_model, target_id: UUID) -> int | None:
+    query = select(target_model.likes_count).where(target_model.id == target_id)
+    return (await session.execute(query)).scalar_one_or_none()
 
-        post.likes_count = likes_count
-        post.is_liked = is_liked
-        post.comments_count = comments_count
 
-        return post
+class PostRepository(CRUDRepository):
+    model = Post
 
-    async def get_posts(self, user_id: UUID) -> list[Post]:
-        # Correlated subqueries
-        post_likes_count = (
-            select(func.count())
-            .where(PostLike.post_id == Post.id)
-            .correlate(Post)
-            .scalar_subquery()
+    async def get_post(self, post_id: UUID) -> Post | None:
+        query = (
+            select(Post).where(Post.id == post_id).options(selectinload(Post.author))
         )
+        result = await self.session.execute(query)
+        return result.scalar_one_or_none()
 
-        is_liked = (
-            exists()
-            .where(PostLike.post_id == Post.id)
-            .where(PostLike.user_id == user_id)
-            .correlate(Post)
+    async def get_user_posts(
+        self, user_id: UUID, limit: int, after: tuple | None = None
+    ) -> list[Post]:
+        # ix_posts_user_created serves the filter, the order and the seek.
+        stmt = (
+            select(Post)
+            .where(Post.user_id == user_id)
+            .options(selectinload(Post.author))
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .limit(limit + 1)
         )
+        if after is not None:
+            stmt = stmt.where(keyset_after((Post.created_at, Post.id), after))
+        results = await self.session.execute(stmt)
+        return results.scalars().all()
 
-        comments_count = (
-            select(func.count())
-            .where(Comment.post_id == Post.id)
-            .correlate(Post)
-            .scalar_subquery()
+    async def get_posts_by_ids(self, post_ids: list[UUID]) -> list[Post]:
+        # A single array parameter: one prepared statement for any batch size.
+        ids = bindparam("post_ids", post_ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+        query = (
+            select(Post).where(Post.id == any_(ids)).options(selectinload(Post.author))
         )
+        result = await self.session.execute(query)
+        return result.scalars().all()
 
-        # Main query
-        stmt = select(
-            Post,
-            post_likes_count.label("likes_count"),
-            is_liked.label("is_liked"),
-            comments_count.label("comments_count"),
-        ).options(selectinload(Post.author))
+    async def get_posts(
+        self,
+        limit: int,
+        after: tuple | None = None,
+        tag_ids: list[UUID] | None = None,
+        match_all: bool = False,
+    ) -> list[Post]:
+        # Newest first; ix_posts_created_id serves both the order and the
+        # keyset seek, so every page costs the same.
+        stmt = (
+            select(Post)
+            .options(selectinload(Post.author))
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .limit(limit + 1)
+        )
+        if after is not None:
+            stmt = stmt.where(keyset_after((Post.created_at, Post.id), after))
+        if tag_ids:
+            # Semi-joins probing ix_post_tags_tag_post: walking posts newest
+            # first stops after limit + 1 matches however many posts a tag
+            # has, and a rare tag can drive the join from its side instead.
+            if match_all:
+                stmt = stmt.where(
+                    *(
+                        exists().where(
+                            PostTag.tag_id == tag_id, PostTag.post_id == Post.id
+                        )
+                        for tag_id in tag_ids
+                    )
+                )
+            else:
+                stmt = stmt.where(
+                    exists().where(
+                        PostTag.tag_id.in_(tag_ids), PostTag.post_id == Post.id
+                    )
+                )
         results = await self.session.execute(stmt)
-        posts = []
-        for row in results.all():
-            post = row.Post
-            post.likes_count = row.likes_count
-            post.is_liked = row.is_liked
-            post.comments_count = row.comments_count
-            posts.append(post)
-
-        return posts
+        return results.scalars().all()
+
+    async def search_posts(
+        self, q: str, limit: int, after: tuple | None = None
+    ) -> list[Row]:
+        """Posts matching the web-search style query `q`, best first, as rows
+        of (Post, rank, snippet). Pages are keyed by (rank, id)."""
+        config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        query = func.websearch_to_tsquery(config, q)
+        rank = func.ts_rank_cd(Post.search_vector, query)
+        matches = select(Post.id, rank.label("rank")).where(
+            Post.search_vector.bool_op("@@")(query)
+        )
+        if after is not None:
+            matches = matches.where(keyset_after((rank, Post.id), after))
+        matches = (
+            matches.order_by(rank.desc(), Post.id.desc()).limit(limit + 1).subquery()
+        )
+        # ts_headline re-parses the document, so only run it for the page.
+        content = func.translate(
+            func.coalesce(Post.content, ""), HEADLINE_START + HEADLINE_STOP, ""
+        )
+        snippet = func.ts_headline(config, content, query, HEADLINE_OPTIONS)
+        stmt = (
+            select(Post, matches.c.rank, snippet.label("snippet"))
+            .join(matches, matches.c.id == Post.id)
+            .options(selectinload(Post.author))
+            .order_by(matches.c.rank.desc(), Post.id.desc())
+        )
+        result = await self.session.execute(stmt)
+        return result.all()
 
-    async def get_post_with_comments(self, post_id: UUID):
+    async def get_post_with_comments(
+        self, post_id: UUID, limit: int, after: tuple | None = None
+    ) -> tuple[Post, list[Comment]] | None:
         query = (
             select(self.model)
             .where(self.model.id == post_id)
-            .options(
-                selectinload(self.model.comments),
-                selectinload(self.model.author),
-                selectinload(self.model.comments).selectinload(Comment.author),
-            )
+            .options(selectinload(self.model.author))
         )
+        result = await self.session.execute(query)
+        post = result.scalar_one_or_none()
+        if not post:
+            return None
 
+        # Only one window of top-level comments, oldest first, seeked through
+        # ix_comments_post_roots; replies are expanded on demand.
+        comments_query = (
+            select(Comment)
+            .where(Comment.post_id == post_id, Comment.parent_id.is_(None))
+            .options(selectinload(Comment.author))
+            .order_by(Comment.created_at, Comment.id)
+            .limit(limit + 1)
+        )
+        if after is not None:
+            comments_query = comments_query.where(
+                keyset_after((Comment.created_at, Comment.id), after, descending=False)
+            )
+        result = await self.session.execute(comments_query)
+        return post, result.scalars().all()
+
+    async def get_hot_scores(
+        self,
+        since: datetime,
+        epoch: float,
+        half_life: float,
+        like_weight: float,
+        comment_weight: float,
+        limit: int,
+    ) -> list[Row]:
+        """(post_id, score) for the posts with the highest time-decayed sum of
+        likes and comments since `since`, using the same weighting as
+        `src.posts.hot`."""
+
+        def decayed(weight: float, created_at):
+            seconds = cast(func.extract("epoch", created_at), Float)
+            age = (seconds - epoch) / float(half_life)
+            return (weight * func.power(2.0, age)).label("score")
+
+        interactions = union_all(
+            select(PostLike.post_id, decayed(like_weight, PostLike.created_at)).where(
+                PostLike.created_at >= since
+            ),
+            select(Comment.post_id, decayed(comment_weight, Comment.created_at)).where(
+                Comment.created_at >= since
+            ),
+        ).subquery()
+        score = func.sum(interactions.c.score)
+        query = (
+            select(interactions.c.post_id, score.label("score"))
+            .group_by(interactions.c.post_id)
+            .order_by(score.desc())
+            .limit(limit)
+        )
         result = await self.session.execute(query)
-        return result.scalar_one_or_none()
+        return result.all()
+
+    async def get_tag_ids(self, slugs: list[str]) -> list[UUID]:
+        result = await self.session.execute(select(Tag.id).where(Tag.slug.in_(slugs)))
+        return result.scalars().all()
 
     async def get_post_tags(self, post_id: UUID):
         query = (
@@ -121,31 +355,57 @@ class PostRepository(CRUDRepository):
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def reconcile_counters(self) -> list[UUID]:
+        likes_count = (
+            select(func.count())
+            .where(PostLike.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+        )
+        comments_count = (
+            select(func.count())
+            .where(Comment.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Post)
+            .values(
+                likes_count=likes_count,
+                comments_count=comments_count,
+                updated_at=Post.updated_at,
+            )
+            .where(
+                or_(
+                    Post.likes_count != likes_count,
+                    Post.comments_count != comments_count,
+                )
+            )
+            .returning(Post.id)
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.scalars().all()
+
+
+MAX_TREE_NODES = 1000
+
+COMMENT_SORT_COLUMNS = {
+    CommentSort.newest: (Comment.created_at, Comment.id),
+    CommentSort.oldest: (Comment.created_at, Comment.id),
+    CommentSort.top: (Comment.likes_count, Comment.created_at, Comment.id),
+}
+
 
 class CommentRepository(CRUDRepository):
     model = Comment
 
     async def get_comment(self, comment_id: UUID, user_id: UUID):
-        likes_count = (
-            select(func.count())
-            .where(CommentLike.comment_id == comment_id)
-            .scalar_subquery()
-        )
         is_liked = exists().where(
             CommentLike.comment_id == comment_id, CommentLike.user_id == user_id
         )
-        replies_count = (
-            select(func.count())
-            .where(Comment.parent_id == comment_id)
-            .scalar_subquery()
-        )
         query = (
-            select(
-                Comment,
-                likes_count.label("likes_count"),
-                is_liked.label("is_liked"),
-                replies_count.label("replies_count"),
-            )
+            select(Comment, is_liked.label("is_liked"))
             .where(Comment.id == comment_id)
             .options(selectinload(Comment.author))
         )
@@ -155,27 +415,59 @@ class CommentRepository(CRUDRepository):
         if not row:
             return None
 
-        comment, likes_count, is_liked, replies_count = row
-
-        comment.likes_count = likes_count
+        comment, is_liked = row
         comment.is_liked = is_liked
-        comment.replies_count = replies_count
 
         return comment
 
-    async def get_comments(self, user_id: UUID) -> list[Comment]:
-        likes_count = (
-            select(func.count())
-            .where(CommentLike.comment_id == Comment.id)
-            .correlate(Comment)
-            .scalar_subquery()
-        )
+    async def get_comments(
+        self,
+        user_id: UUID,
+        limit: int,
+        sort: CommentSort = CommentSort.newest,
+        post_id: UUID | None = None,
+        author_id: UUID | None = None,
+        after: tuple | None = None,
+    ) -> list[Comment]:
         is_liked = (
             exists()
             .where(CommentLike.comment_id == Comment.id, CommentLike.user_id == user_id)
             .correlate(Comment)
         )
+        # Scoped by post and/or author, each served by its own
+        # (scope, sort key) index so a page never touches the rest of the table.
+        sort_columns = COMMENT_SORT_COLUMNS[sort]
+        descending = sort != CommentSort.oldest
+        query = (
+            select(Comment, is_liked.label("is_liked"))
+            .options(selectinload(Comment.author))
+            .order_by(
+                *(col.desc() if descending else col.asc() for col in sort_columns)
+            )
+            .limit(limit + 1)
+        )
+        if post_id is not None:
+            query = query.where(Comment.post_id == post_id)
+        if author_id is not None:
+            query = query.where(Comment.user_id == author_id)
+        if after is not None:
+            query = query.where(keyset_after(sort_columns, after, descending))
+
+        results = await self.session.execute(query)
+        comments = []
+        for row in results.all():
+            comment = row.Comment
+            comment.is_liked = row.is_liked
+            comments.append(comment)
+        return comments
 
+    async def reconcile_counters(self) -> list[UUID]:
+        likes_count = (
+            select(func.count())
+            .where(CommentLike.comment_id == Comment.id)
+            .correlate(Comment)
+            .scalar_subquery()
+        )
         ChildComment = aliased(Comment)
         replies_count = (
             select(func.count())
@@ -184,67 +476,267 @@ class CommentRepository(CRUDRepository):
             .correlate(Comment)
             .scalar_subquery()
         )
-        query = select(
-            Comment,
-            likes_count.label("likes_count"),
-            is_liked.label("is_liked"),
-            replies_count.label("replies_count"),
-        ).options(selectinload(Comment.author))
+        stmt = (
+            update(Comment)
+            .values(
+                likes_count=likes_count,
+                replies_count=replies_count,
+                updated_at=Comment.updated_at,
+            )
+            .where(
+                or_(
+                    Comment.likes_count != likes_count,
+                    Comment.replies_count != replies_count,
+                )
+            )
+            .returning(Comment.id)
+        )
+        result = await self.session.execute(stmt)
+        await self.session.commit()
+        return result.scalars().all()
 
-        results = await self.session.execute(query)
-        comments = []
-        for row in results.all():
-            comment = row.Comment
-            comment.likes_count = row.likes_count
-            comment.is_liked = row.is_liked
-            comment.replies_count = row.replies_count
-            comments.append(comment)
-        return comments
+    async def create_comment(self, new_data: dict) -> Comment:
+        new_data["id"] = comment_id = uuid4()
+        segment = _path_segment(comment_id)
+        if new_data.get("parent_id") is None:
+            new_data["path"] = segment
+            new_data["depth"] = 0
+        else:
+            # A reply has to sit under a parent on the same post, or its path
+            # would land in another post's subtree.
+            result = await self.session.execute(
+                select(Comment.path, Comment.depth).where(
+                    Comment.id == new_data["parent_id"],
+                    Comment.post_id == new_data["post_id"],
+                )
+            )
+            parent = result.one_or_none()
+            if parent is None:
+                raise CommentNotFoundException
+            new_data["path"] = parent.path + PATH_SEPARATOR + segment
+            new_data["depth"] = parent.depth + 1
+        comment = await self.create(new_data, commit=False)
+        await self.session.execute(
+            _shift_counters(Post, comment.post_id, comments_count=1)
+        )
+        if comment.parent_id is not None:
+            await self.session.execute(
+                _shift_counters(Comment, comment.parent_id, replies_count=1)
+            )
+        await self.session.commit()
+        return comment
+
+    async def delete_comment(
+        self, comment_id: UUID, user_id: UUID
+    ) -> tuple[Comment, list[UUID]] | None:
+        """The deleted comment and the ids of its whole subtree, itself
+        included."""
+        # Replies go away through ON DELETE CASCADE, so the subtree has to be
+        # read before the delete to keep posts.comments_count in step.
+        root_path = (
+            select(Comment.path).where(Comment.id == comment_id).scalar_subquery()
+        )
+        removed = await self.session.execute(
+            select(Comment.id).where(_subtree_of(root_path))
+        )
+        removed_ids = removed.scalars().all()
+
+        deleted = await self.delete_one_or_more(
+            commit=False, id=comment_id, user_id=user_id
+        )
+        if not deleted:
+            await self.session.rollback()
+            return None
+
+        comment = deleted[0]
+        await self.session.execute(
+            _shift_counters(Post, comment.post_id, comments_count=-len(removed_ids))
+        )
+        if comment.parent_id is not None:
+            await self.session.execute(
+                _shift_counters(Comment, comment.parent_id, replies_count=-1)
+            )
+        await self.session.commit()
+        return comment, removed_ids
+
+    async def get_thread(
+        self,
+        comment_id: UUID,
+        max_depth: int,
+        limit: int,
+        after: str | None = None,
+    ) -> list[Comment]:
+        # One range scan over ix_comments_path: the subtree in depth-first
+        # order, cut at max_depth and seeked by path.
+        root = select(Comment.path, Comment.depth).where(Comment.id == comment_id)
+        root_path = root.with_only_columns(Comment.path).scalar_subquery()
+        root_depth = root.with_only_columns(Comment.depth).scalar_subquery()
+        query = (
+            select(Comment)
+            .where(_subtree_of(root_path), Comment.depth <= root_depth + max_depth)
+            .options(selectinload(Comment.author))
+            .order_by(Comment.path)
+            .limit(limit + 1)
+        )
+        if after is not None:
+            query = query.where(Comment.path > after)
+        result = await self.session.execute(query)
+        return result.scalars().all()
 
-    async def get_comments_with_children(self, comment_id: UUID):
-        # level literal(1).label("level")
+    async def get_comments_with_children(
+        self,
+        comment_id: UUID,
+        max_depth: int,
+        max_children: int,
+        after: tuple | None = None,
+    ) -> list[Row]:
         # Base case
-        anchor = select(Comment.id).where(Comment.id == comment_id)
+        anchor = select(
+            Comment.id, Comment.created_at, literal_column("0").label("depth")
+        ).where(Comment.id == comment_id)
         comments_cte = anchor.cte(name="comments_cte", recursive=True)
 
-        recursive = select(Comment.id).join(
-            comments_cte, Comment.parent_id == comments_cte.c.id
+        # At most max_children replies per expanded node; `after` only
+        # continues the root's own replies.
+        children = select(Comment.id, Comment.created_at).where(
+            Comment.parent_id == comments_cte.c.id
+        )
+        if after is not None:
+            children = children.where(
+                or_(
+                    comments_cte.c.id != comment_id,
+                    keyset_after(
+                        (Comment.created_at, Comment.id), after, descending=False
+                    ),
+                )
+            )
+        children = (
+            children.order_by(Comment.created_at, Comment.id)
+            .limit(max_children)
+            .lateral("children")
+        )
+        recursive = (
+            select(
+                children.c.id,
+                children.c.created_at,
+                (comments_cte.c.depth + 1).label("depth"),
+            )
+            .select_from(comments_cte)
+            .join(children, true())
+            .where(comments_cte.c.depth < max_depth)
         )
         comments_cte = comments_cte.union_all(recursive)
 
-        # Join back to get full objects while preserving CTE logic
+        # Postgres does not promise the CTE's output order, so the node
+        # budget is cut in the same order the tree is rendered: shallowest
+        # levels first, oldest replies first within a level.
+        bounded = (
+            select(comments_cte.c.id, comments_cte.c.depth)
+            .order_by(
+                comments_cte.c.depth, comments_cte.c.created_at, comments_cte.c.id
+            )
+            .limit(MAX_TREE_NODES)
+            .subquery()
+        )
+
+        # Plain rows rather than ORM objects: the tree is assembled and
+        # serialized straight from these tuples.
         final_query = (
-            select(Comment)
-            .join(comments_cte, Comment.id == comments_cte.c.id)
-            .options(selectinload(Comment.author))
+            select(
+                Comment.id,
+                Comment.user_id,
+                Comment.post_id,
+                Comment.parent_id,
+                Comment.content,
+                Comment.created_at,
+                Comment.updated_at,
+                Comment.likes_count,
+                Comment.replies_count,
+                User.username,
+                User.email,
+                User.image_file,
+            )
+            .join(bounded, Comment.id == bounded.c.id)
+            .join(User, User.id == Comment.user_id)
+            .order_by(bounded.c.depth, Comment.created_at, Comment.id)
         )
 
         result = await self.session.execute(final_query)
-        return result.scalars().all()
+        return result.all()
+
+    async def has_replies_after(self, comment_id: UUID, after: tuple) -> bool:
+        query = select(
+            exists().where(
+                Comment.parent_id == comment_id,
+                keyset_after((Comment.created_at, Comment.id), after, descending=False),
+            )
+        )
+        result = await self.session.execute(query)
+        return result.scalar_one()
 
 
 class TagRepository(CRUDRepository):
     model = Tag
 
     async def add_tag_to_post(self, tag_id: UUID, post_id: UUID):
-        stmt = insert(PostTag).values(tag_id=tag_id, post_id=post_id).returning(PostTag)
         try:
-            result = await self.session.execute(stmt)
-            await self.session.commit()
-            return result.scalar_one()
+            row = await self.create_or_ignore(
+                {"tag_id": tag_id, "post_id": post_id}, model=PostTag
+            )
+        except ForeignKeyConstraintError as e:
+            if e.constraint_name == "post_tags_post_id_fkey":
+                raise PostNotFoundException from e
+            if e.constraint_name == "post_tags_tag_id_fkey":
+                raise TagNotFoundException from e
+            raise
+        if row is None:
+            raise PostTagUniqueViolationException
+        return row
+
+    async def add_tags_to_post(
+        self, post_id: UUID, tag_ids: list[UUID]
+    ) -> dict[UUID, bool]:
+        """Attach many tags in one statement. Returns, for every requested tag
+        that exists, whether it was added (False: already assigned)."""
+        ids = bindparam("tag_ids", tag_ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+        found = select(Tag.id).where(Tag.id == any_(ids)).cte("found")
+        added = (
+            pg_insert(PostTag)
+            .from_select(
+                ["post_id", "tag_id"],
+                select(literal(post_id, PG_UUID(as_uuid=True)), found.c.id),
+            )
+            .on_conflict_do_nothing()
+            .returning(PostTag.tag_id)
+            .cte("added")
+        )
+        query = select(found.c.id, added.c.tag_id.is_not(None)).outerjoin(
+            added, added.c.tag_id == found.c.id
+        )
+        try:
+            result = await self.session.execute(query)
+            rows = result.all()
         except IntegrityError as e:
             await self.session.rollback()
-            orig = e.orig.__cause__
-            if isinstance(orig, asyncpg.exceptions.UniqueViolationError):
-                raise PostTagUniqueViolationException from e
-            if isinstance(orig, asyncpg.exceptions.ForeignKeyViolationError):
-                constraint = orig.constraint_name
-
-                if constraint == "post_tags_post_id_fkey":
-                    raise PostNotFoundException from e
-                if constraint == "post_tags_tag_id_fkey":
-                    raise TagNotFoundException from e
+            raise_constraint_error(e)
             raise
+        await self.session.commit()
+        return dict(rows)
+
+    async def delete_tags_from_post(
+        self, post_id: UUID, tag_ids: list[UUID]
+    ) -> list[UUID]:
+        """Detach many tags in one statement; returns the ids actually removed."""
+        ids = bindparam("tag_ids", tag_ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+        stmt = (
+            delete(PostTag)
+            .where(PostTag.post_id == post_id, PostTag.tag_id == any_(ids))
+            .returning(PostTag.tag_id)
+        )
+        result = await self.session.execute(stmt)
+        removed = result.scalars().all()
+        await self.session.commit()
+        return removed
 
     async def delete_tag_from_post(self, tag_id: UUID, post_id: UUID):
         stmt = (
@@ -263,15 +755,106 @@ class TagRepository(CRUDRepository):
 class PostLikeRepository(CRUDRepository):
     model = PostLike
 
-    async def get_who_liked(self, post_id: UUID):
-        query = (
-            select(User.username, User.email, User.id)
-            .join(PostLike, PostLike.user_id == User.id)
-            .where(PostLike.post_id == post_id)
+    async def get_liked_post_ids(
+        self, user_id: UUID, post_ids: list[UUID] | None = None
+    ) -> list[UUID]:
+        # Served by the uq_user_post_like (user_id, post_id) index
+        query = select(PostLike.post_id).where(PostLike.user_id == user_id)
+        if post_ids is not None:
+            query = query.where(PostLike.post_id.in_(post_ids))
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def get_like_seed(
+        self, post_id: UUID, user_id: UUID
+    ) -> tuple[bool, int] | None:
+        liked = exists().where(PostLike.post_id == post_id, PostLike.user_id == user_id)
+        query = select(liked, Post.likes_count).where(Post.id == post_id)
+        row = (await self.session.execute(query)).first()
+        return tuple(row) if row else None
+
+    async def apply_like_changes(self, liked: list[dict], unliked: list[tuple]):
+        return await _apply_like_changes(
+            self.session, PostLike.post_id, Post, liked, unliked
         )
-        results = await self.session.execute(query)
-        return results.mappings().all()
+
+    async def like_post(self, post_id: UUID, user_id: UUID) -> PostLike | None:
+        """Return the new like, or None if the user already liked the post."""
+        like = await self.create_or_ignore(
+            {"post_id": post_id, "user_id": user_id}, commit=False
+        )
+        if like:
+            await self.session.execute(_shift_counters(Post, post_id, likes_count=1))
+        await self.session.commit()
+        return like
+
+    async def unlike_post(self, post_id: UUID, user_id: UUID) -> list[PostLike]:
+        likes = await self.delete_one_or_more(
+            commit=False, post_id=post_id, user_id=user_id
+        )
+        if likes:
+            await self.session.execute(
+                _shift_counters(Post, post_id, likes_count=-len(likes))
+            )
+        await self.session.commit()
+        return likes
+
+    async def get_likers(self, post_id: UUID, limit: int, after: tuple | None = None):
+        return await _get_likers(self.session, PostLike.post_id, post_id, limit, after)
+
+    async def get_likes_count(self, post_id: UUID) -> int | None:
+        return await _get_likes_count(self.session, Post, post_id)
 
 
 class CommentLikeRepository(CRUDRepository):
     model = CommentLike
+
+    async def get_like_seed(
+        self, comment_id: UUID, user_id: UUID
+    ) -> tuple[bool, int] | None:
+        liked = exists().where(
+            CommentLike.comment_id == comment_id, CommentLike.user_id == user_id
+        )
+        query = select(liked, Comment.likes_count).where(Comment.id == comment_id)
+        row = (await self.session.execute(query)).first()
+        return tuple(row) if row else None
+
+    async def apply_like_changes(self, liked: list[dict], unliked: list[tuple]):
+        return await _apply_like_changes(
+            self.session, CommentLike.comment_id, Comment, liked, unliked
+        )
+
+    async def like_comment(self, comment_id: UUID, user_id: UUID) -> CommentLike | None:
+        """Return the new like, or None if the user already liked the comment."""
+        like = await self.create_or_ignore(
+            {"comment_id": comment_id, "user_id": user_id}, commit=False
+        )
+        if like:
+            await self.session.execute(
+                _shift_counters(Comment, comment_id, likes_count=1)
+            )
+        await self.session.commit()
+        return like
+
+    async def unlike_comment(
+        self, comment_id: UUID, user_id: UUID
+    ) -> list[CommentLike]:
+        likes = await self.delete_one_or_more(
+            commit=False, comment_id=comment_id, user_id=user_id
+        )
+        if likes:
+            await self.session.execute(
+                _shift_counters(Comment, comment_id, likes_count=-len(likes))
+            )
+        await self.session.commit()
+        return likes
+
+    async def get_likers(
+        self, comment_id: UUID, limit: int, after: tuple | None = None
+    ):
+        return await _get_likers(
+            self.session, CommentLike.comment_id, comment_id, limit, after
+        )
+
+    async def get_likes_count(self, comment_id: UUID) -> int | None:
+        return await _get_likes_count(self.session, Comment, comment_id)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import StrEnum
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -22,18 +23,62 @@ class PostUpdate(PostBase):
     content: str | None = None
 
 
-class PostResponse(PostBase):
+class PostSummary(PostBase):
     model_config = ConfigDict(from_attributes=True)
     id: UUID
     user_id: UUID
     created_at: datetime
     updated_at: datetime
     author: UserResponse
+
+
+class PostBody(PostSummary):
+    # Viewer-independent part of a post, shared by every viewer's cache hit.
     likes_count: int
-    is_liked: bool
     comments_count: int
 
 
+class PostResponse(PostBody):
+    is_liked: bool
+
+
+MAX_FILTER_TAGS = 10
+
+
+class TagMatch(StrEnum):
+    any = "any"
+    all = "all"
+
+
+class PostPage(BaseModel):
+    items: list[PostResponse]
+    next_cursor: str | None
+
+
+class PostSearchHit(PostResponse):
+    rank: float
+    # HTML-escaped content excerpt with the matched terms wrapped in <mark>.
+    snippet: str
+
+
+class PostSearchPage(BaseModel):
+    items: list[PostSearchHit]
+    next_cursor: str | None
+
+
+MAX_BATCH_POSTS = 200
+
+
+class PostBatchRequest(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=MAX_BATCH_POSTS)
+
+
+class PostBatch(BaseModel):
+    # Found posts in request order; ids that don't exist are listed apart.
+    items: list[PostResponse]
+    missing: list[UUID]
+
+
 # COMMENT
 
 
@@ -50,7 +95,7 @@ class CommentUpdate(CommentBase):
     content: str | None = None
 
 
-class CommentResponse(CommentBase):
+class CommentSummary(CommentBase):
     model_config = ConfigDict(from_attributes=True)
     id: UUID
     user_id: UUID
@@ -60,18 +105,38 @@ class CommentResponse(CommentBase):
     updated_at: datetime
     author: UserResponse
     likes_count: int
-    is_liked: bool
     replies_count: int
 
 
-class PostComments(PostBase):
-    model_config = ConfigDict(from_attributes=True)
-    id: UUID
-    user_id: UUID
-    created_at: datetime
-    updated_at: datetime
-    author: UserResponse
-    comments: list[CommentResponse]
+class CommentResponse(CommentSummary):
+    is_liked: bool
+
+
+class CommentSort(StrEnum):
+    newest = "newest"
+    oldest = "oldest"
+    top = "top"
+
+
+class CommentPage(BaseModel):
+    items: list[CommentResponse]
+    next_cursor: str | None
+
+
+class ThreadComment(CommentSummary):
+    depth: int
+
+
+class ThreadPage(BaseModel):
+    # Depth-first order; depth is absolute, the root comment's own depth first.
+    items: list[ThreadComment]
+    next_cursor: str | None
+
+
+class PostComments(PostSummary):
+    # One window of top-level comments; next_cursor fetches the next one.
+    comments: list[CommentSummary]
+    next_cursor: str | None
 
 
 class CommentWithChildren(BaseModel):
@@ -85,7 +150,13 @@ class CommentWithChildren(BaseModel):
     created_at: datetime
     updated_at: datetime
     author: UserResponse
+    likes_count: int
+    replies_count: int
     children: list["CommentWithChildren"] = []
+    # Set when some replies were not expanded; fetch them from
+    # /{id}/childrens, passing next_cursor when present.
+    has_more: bool = False
+    next_cursor: str | None = None
 
 
 # Required for recursive model
@@ -120,6 +191,35 @@ class PostTagResponse(BaseModel):
     tag_id: UUID
 
 
+MAX_BULK_TAGS = 100
+
+
+class BulkStatus(StrEnum):
+    created = "created"
+    deleted = "deleted"
+    conflict = "conflict"
+    not_found = "not_found"
+
+
+class TagsCreate(BaseModel):
+    tags: list[TagCreate] = Field(min_length=1, max_length=MAX_BULK_TAGS)
+
+
+class TagCreateResult(BaseModel):
+    name: str
+    status: BulkStatus
+    tag: TagResponse | None = None
+
+
+class PostTagsUpdate(BaseModel):
+    tag_ids: list[UUID] = Field(min_length=1, max_length=MAX_BULK_TAGS)
+
+
+class PostTagResult(BaseModel):
+    tag_id: UUID
+    status: BulkStatus
+
+
 class PostLikeResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     id: UUID
@@ -142,3 +242,14 @@ class UserLikedResponse(BaseModel):
     username: str
     email: str
     id: UUID
+
+
+class LikerResponse(UserLikedResponse):
+    liked_at: datetime
+
+
+class LikersPage(BaseModel):
+    # Newest likes first; total comes from the target's likes_count.
+    items: list[LikerResponse]
+    total: int
+    next_cursor: str | None
@@ -2,44 +2,158 @@ from uuid import UUID
 
 from slugify import slugify
 
-from src.core.exceptions import ForeignKeyConstraintError, UniqueConstraintError
+from src.core.exceptions import (
+    ForeignKeyConstraintError,
+    InvalidCursorError,
+)
+from src.core.pagination import (
+    aware_datetime,
+    decode_cursor,
+    encode_cursor,
+    split_page,
+)
 from src.posts.exceptions import (
     CommentLikeNotFoundException,
     CommentLikeUniqueViolationException,
     CommentNotFoundException,
+    InvalidCursorException,
     PostLikeNotFoundException,
     PostLikeUniqueViolationException,
     PostNotFoundException,
 )
-from src.posts.models import Comment, Post, Tag
+from src.posts.hot import COMMENT_WEIGHT, LIKE_WEIGHT, HotPosts
+from src.posts.like_batcher import LikeBatcher
+from src.posts.like_buffer import LikeBuffer
+from src.posts.likes import LikeStore
+from src.posts.models import Comment, Tag
 from src.posts.repository import (
+    COMMENT_SORT_COLUMNS,
     CommentLikeRepository,
     CommentRepository,
     PostLikeRepository,
     PostRepository,
     TagRepository,
+    highlight_snippet,
 )
 from src.posts.schemas import (
+    BulkStatus,
     CommentCreate,
+    CommentSort,
     CommentUpdate,
-    CommentWithChildren,
+    LikerResponse,
+    PostBody,
     PostCreate,
+    PostSummary,
     PostUpdate,
     TagCreate,
+    TagMatch,
+    TagsCreate,
     TagUpdate,
 )
+from src.posts.tree import build_comment_tree
 from src.users.exceptions import UserNotFoundException
 
 
+def _decode_cursor(cursor: str | None, *types) -> tuple | None:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, *types)
+    except InvalidCursorError:
+        raise InvalidCursorException()
+
+
+def _likers_page(rows, limit: int) -> dict:
+    items, next_cursor = split_page(
+        rows, limit, lambda r: (r["liked_at"], r["like_id"])
+    )
+    return {
+        "items": [
+            LikerResponse.model_validate(r).model_dump(mode="json") for r in items
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
 class PostService:
     def __init__(self, repo: PostRepository):
         self.repository = repo
 
-    async def get_post(self, post_id: UUID, user_id: UUID):
-        return await self.repository.get_post(post_id=post_id, user_id=user_id)
+    async def get_post(self, post_id: UUID):
+        return await self.repository.get_post(post_id=post_id)
 
-    async def get_posts(self, user_id: UUID):
-        return await self.repository.get_posts(user_id=user_id)
+    async def get_post_body(self, post_id: UUID) -> dict | None:
+        post = await self.repository.get_post(post_id=post_id)
+        if not post:
+            return None
+        return PostBody.model_validate(post).model_dump(mode="json")
+
+    async def get_post_bodies(self, post_ids: list[UUID]) -> dict[UUID, dict]:
+        posts = await self.repository.get_posts_by_ids(post_ids=post_ids)
+        return {p.id: PostBody.model_validate(p).model_dump(mode="json") for p in posts}
+
+    async def get_posts(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        tags: list[str] | None = None,
+        match: TagMatch = TagMatch.any,
+    ) -> dict:
+        after = _decode_cursor(cursor, aware_datetime, UUID)
+        tag_ids = None
+        if tags:
+            slugs = set(tags)
+            tag_ids = await self.repository.get_tag_ids(slugs=list(slugs))
+            if not tag_ids or (match == TagMatch.all and len(tag_ids) < len(slugs)):
+                return {"items": [], "next_cursor": None, "tag_ids": []}
+        posts = await self.repository.get_posts(
+            limit=limit,
+            after=after,
+            tag_ids=tag_ids,
+            match_all=match == TagMatch.all,
+        )
+        items, next_cursor = split_page(posts, limit, lambda p: (p.created_at, p.id))
+        page = {
+            "items": [
+                PostBody.model_validate(p).model_dump(mode="json") for p in items
+            ],
+            "next_cursor": next_cursor,
+        }
+        if tag_ids is not None:
+            # The resolved tags, so cached pages can depend on them.
+            page["tag_ids"] = [str(tag_id) for tag_id in tag_ids]
+        return page
+
+    async def get_user_posts(
+        self, user_id: UUID, limit: int, cursor: str | None = None
+    ) -> dict:
+        after = _decode_cursor(cursor, aware_datetime, UUID)
+        posts = await self.repository.get_user_posts(
+            user_id=user_id, limit=limit, after=after
+        )
+        items, next_cursor = split_page(posts, limit, lambda p: (p.created_at, p.id))
+        return {
+            "items": [
+                PostBody.model_validate(p).model_dump(mode="json") for p in items
+            ],
+            "next_cursor": next_cursor,
+        }
+
+    async def search_posts(self, q: str, limit: int, cursor: str | None = None) -> dict:
+        after = _decode_cursor(cursor, float, UUID)
+        rows = await self.repository.search_posts(q=q, limit=limit, after=after)
+        items, next_cursor = split_page(rows, limit, lambda r: (r.rank, r.Post.id))
+        return {
+            "items": [
+                {
+                    **PostBody.model_validate(row.Post).model_dump(mode="json"),
+                    "rank": row.rank,
+                    "snippet": highlight_snippet(row.snippet),
+                }
+                for row in items
+            ],
+            "next_cursor": next_cursor,
+        }
 
     async def create_post(self, data: PostCreate, user_id: UUID):
         new_data = data.model_dump()
@@ -58,28 +172,74 @@ class PostService:
         result = await self.repository.delete_one_or_more(id=post_id, user_id=user_id)
         return result[0] if result else None
 
-    async def get_post_with_comments(self, post_id: UUID) -> Post | None:
-        result = await self.repository.get_post_with_comments(post_id=post_id)
-        return result
+    async def get_post_with_comments(
+        self, post_id: UUID, limit: int, cursor: str | None = None
+    ) -> dict | None:
+        after = _decode_cursor(cursor, aware_datetime, UUID)
+        result = await self.repository.get_post_with_comments(
+            post_id=post_id, limit=limit, after=after
+        )
+        if not result:
+            return None
+
+        post, comments = result
+        items, next_cursor = split_page(comments, limit, lambda c: (c.created_at, c.id))
+        return {
+            **PostSummary.model_validate(post).model_dump(),
+            "comments": items,
+            "next_cursor": next_cursor,
+        }
 
     async def get_post_tags(self, post_id: UUID):
         return await self.repository.get_post_tags(post_id=post_id)
 
 
 class CommentService:
-    def __init__(self, repo: CommentRepository):
+    def __init__(self, repo: CommentRepository, hot: HotPosts):
         self.repository = repo
+        self.hot = hot
 
     async def get_comment(self, comment_id: UUID, user_id: UUID) -> Comment | None:
         return await self.repository.get_comment(comment_id=comment_id, user_id=user_id)
 
-    async def get_comments(self, user_id: UUID):
-        return await self.repository.get_comments(user_id)
+    async def get_comments(
+        self,
+        user_id: UUID,
+        limit: int,
+        sort: CommentSort = CommentSort.newest,
+        post_id: UUID | None = None,
+        author_id: UUID | None = None,
+        cursor: str | None = None,
+    ):
+        # Unscoped requests list the caller's own comments.
+        if post_id is None and author_id is None:
+            author_id = user_id
+        sort_columns = COMMENT_SORT_COLUMNS[sort]
+        if sort == CommentSort.top:
+            after = _decode_cursor(cursor, int, aware_datetime, UUID)
+        else:
+            after = _decode_cursor(cursor, aware_datetime, UUID)
+        comments = await self.repository.get_comments(
+            user_id=user_id,
+            limit=limit,
+            sort=sort,
+            post_id=post_id,
+            author_id=author_id,
+            after=after,
+        )
+        items, next_cursor = split_page(
+            comments,
+            limit,
+            lambda c: tuple(getattr(c, col.key) for col in sort_columns),
+        )
+        return {"items": items, "next_cursor": next_cursor}
 
     async def create_comment(self, data: CommentCreate, user_id: UUID):
         new_data = data.model_dump()
         new_data["user_id"] = user_id
-        return await self.repository.create(new_data)
+        comment = await self.repository.create_comment(new_data)
+        await self.hot.bump(comment.post_id, COMMENT_WEIGHT)
+        return comment
 
     async def update_comment(
         self, comment_id: UUID, user_id: UUID, data: CommentUpdate
@@ -92,29 +252,58 @@ class CommentService:
         return result[0] if result else None
 
     async def delete_comment(self, comment_id: UUID, user_id: UUID):
-        result = await self.repository.delete_one_or_more(
-            id=comment_id, user_id=user_id
+        return await self.repository.delete_comment(
+            comment_id=comment_id, user_id=user_id
         )
-        return result[0] if result else None
 
-    async def get_comments_with_children(self, comment_id: UUID):
-        rows = await self.repository.get_comments_with_children(comment_id=comment_id)
+    async def get_comments_with_children(
+        self,
+        comment_id: UUID,
+        max_depth: int,
+        max_children: int,
+        cursor: str | None = None,
+    ):
+        after = _decode_cursor(cursor, aware_datetime, UUID)
+        rows = await self.repository.get_comments_with_children(
+            comment_id=comment_id,
+            max_depth=max_depth,
+            max_children=max_children,
+            after=after,
+        )
         if not rows:
             return None
 
-        nodes: dict[UUID, CommentWithChildren] = {}
-        for comment in rows:
-            nodes[comment.id] = CommentWithChildren.model_validate(comment)
-
-        root = None
-        for node in nodes.values():
-            if node.id == comment_id:
-                root = node
-            elif node.parent_id in nodes:
-                nodes[node.parent_id].children.append(node)
-
+        root = build_comment_tree(rows, comment_id)
+        if root is not None and after is not None:
+            # replies_count can't tell how many replies precede the cursor.
+            # rows[0] is the root, directly followed by its loaded replies.
+            root["has_more"], root["next_cursor"] = False, None
+            if root["children"]:
+                last = rows[len(root["children"])]
+                key = (last.created_at, last.id)
+                if await self.repository.has_replies_after(comment_id, key):
+                    root["has_more"], root["next_cursor"] = True, encode_cursor(*key)
         return root
 
+    async def get_thread(
+        self,
+        comment_id: UUID,
+        max_depth: int,
+        limit: int,
+        cursor: str | None = None,
+    ):
+        after = _decode_cursor(cursor, str)
+        comments = await self.repository.get_thread(
+            comment_id=comment_id,
+            max_depth=max_depth,
+            limit=limit,
+            after=after[0] if after else None,
+        )
+        if not comments and after is None:
+            return None
+        items, next_cursor = split_page(comments, limit, lambda c: (c.path,))
+        return {"items": items, "next_cursor": next_cursor}
+
 
 class TagService:
     def __init__(self, repo: TagRepository):
@@ -142,9 +331,57 @@ class TagService:
         result = await self.repository.delete_one_or_more(id=tag_id)
         return result[0] if result else None
 
+    async def create_tags(self, data: TagsCreate) -> list[dict]:
+        # Names that slugify alike are one tag; the first spelling wins.
+        names = {}
+        for tag in data.tags:
+            names.setdefault(slugify(tag.name), tag.name)
+        created = await self.repository.create_many_or_ignore(
+            [{"name": name, "slug": slug} for slug, name in names.items()]
+        )
+        by_slug = {tag.slug: tag for tag in created}
+        results = []
+        for tag in data.tags:
+            new_tag = by_slug.pop(slugify(tag.name), None)
+            status = BulkStatus.created if new_tag else BulkStatus.conflict
+            results.append({"name": tag.name, "status": status, "tag": new_tag})
+        return results
+
     async def add_tag_to_post(self, tag_id: UUID, post_id: UUID):
         return await self.repository.add_tag_to_post(tag_id=tag_id, post_id=post_id)
 
+    async def add_tags_to_post(self, post_id: UUID, tag_ids: list[UUID]) -> list[dict]:
+        try:
+            added = await self.repository.add_tags_to_post(
+                post_id=post_id, tag_ids=tag_ids
+            )
+        except ForeignKeyConstraintError as e:
+            if e.constraint_name == "post_tags_post_id_fkey":
+                raise PostNotFoundException()
+            raise
+        results = []
+        for tag_id in dict.fromkeys(tag_ids):
+            if tag_id not in added:
+                status = BulkStatus.not_found
+            elif added[tag_id]:
+                status = BulkStatus.created
+            else:
+                status = BulkStatus.conflict
+            results.append({"tag_id": tag_id, "status": status})
+        return results
+
+    async def delete_tags_from_post(
+        self, post_id: UUID, tag_ids: list[UUID]
+    ) -> list[dict]:
+        removed = await self.repository.delete_tags_from_post(
+            post_id=post_id, tag_ids=tag_ids
+        )
+        results = []
+        for tag_id in dict.fromkeys(tag_ids):
+            status = BulkStatus.deleted if tag_id in removed else BulkStatus.not_found
+            results.append({"tag_id": tag_id, "status": status})
+        return results
+
     async def delete_tag_from_post(self, tag_id: UUID, post_id: UUID):
         return await self.repository.delete_tag_from_post(
             tag_id=tag_id, post_id=post_id
@@ -152,51 +389,196 @@ class TagService:
 
 
 class PostLikeService:
-    def __init__(self, repo: PostLikeRepository):
+    def __init__(
+        self,
+        repo: PostLikeRepository,
+        likes: LikeStore,
+        hot: HotPosts,
+        buffer: LikeBuffer | None,
+        batcher: LikeBatcher | None,
+    ):
         self.repo = repo
+        self.likes = likes
+        self.hot = hot
+        self.buffer = buffer
+        self.batcher = batcher
 
     async def like_post(self, post_id: UUID, user_id: UUID):
-        data = {"post_id": post_id, "user_id": user_id}
-        try:
-            return await self.repo.create(new_data=data)
-        except UniqueConstraintError:
+        if self.buffer:
+            like = await self._buffered(self.buffer.like, post_id, user_id)
+        elif self.batcher:
+            like = await self._batched(self.batcher.like, post_id, user_id)
+        else:
+            try:
+                like = await self.repo.like_post(post_id=post_id, user_id=user_id)
+            except ForeignKeyConstraintError as e:
+                if e.constraint_name == "post_likes_post_id_fkey":
+                    raise PostNotFoundException()
+                if e.constraint_name == "post_likes_user_id_fkey":
+                    raise UserNotFoundException()
+                raise
+        if like is None:
             raise PostLikeUniqueViolationException()
+        await self.likes.add(user_id, post_id)
+        await self.hot.bump(post_id, LIKE_WEIGHT)
+        return like
+
+    async def unlike_post(self, post_id: UUID, user_id: UUID):
+        if self.buffer:
+            like = await self._buffered(self.buffer.unlike, post_id, user_id)
+        elif self.batcher:
+            like = await self._batched(self.batcher.unlike, post_id, user_id)
+        else:
+            result = await self.repo.unlike_post(post_id=post_id, user_id=user_id)
+            like = result[0] if result else None
+        if not like:
+            raise PostLikeNotFoundException()
+        await self.likes.remove(user_id, post_id)
+        return like
+
+    async def _buffered(self, change, post_id: UUID, user_id: UUID):
+        try:
+            return await change(
+                "post",
+                post_id,
+                user_id,
+                lambda: self.repo.get_like_seed(post_id=post_id, user_id=user_id),
+            )
+        except LookupError:
+            raise PostNotFoundException()
+
+    async def _batched(self, change, post_id: UUID, user_id: UUID):
+        try:
+            return await change(post_id, user_id)
+        except LookupError:
+            raise PostNotFoundException()
         except ForeignKeyConstraintError as e:
             if e.constraint_name == "post_likes_post_id_fkey":
                 raise PostNotFoundException()
             if e.constraint_name == "post_likes_user_id_fkey":
                 raise UserNotFoundException()
-
-    async def unlike_post(self, post_id: UUID, user_id: UUID):
-        result = await self.repo.delete_one_or_more(post_id=post_id, user_id=user_id)
-        if not result:
-            raise PostLikeNotFoundException()
-        return result[0]
-
-    async def get_who_liked(self, post_id: UUID):
-        return await self.repo.get_who_liked(post_id=post_id)
+            raise
+
+    async def liked_post_ids(self, user_id: UUID, post_ids: list[UUID]) -> set[UUID]:
+        liked = await self.likes.liked_post_ids(user_id, post_ids)
+        if liked is None:
+            all_liked = await self.repo.get_liked_post_ids(user_id)
+            await self.likes.warm(user_id, all_liked)
+            liked = set(all_liked).intersection(post_ids)
+        return liked
+
+    async def with_is_liked(self, user_id: UUID, posts: list[dict]) -> list[dict]:
+        """Overlay the viewer's is_liked onto shared, cached post bodies."""
+        post_ids = [UUID(p["id"]) for p in posts]
+        liked = await self.liked_post_ids(user_id, post_ids)
+        if not self.buffer:
+            return [{**p, "is_liked": UUID(p["id"]) in liked} for p in posts]
+
+        # Buffered likes haven't reached the database (or the cached bodies) yet.
+        counts, members = await self.buffer.peek("post", user_id, post_ids)
+        return [
+            {
+                **p,
+                "likes_count": counts.get(post_id, p["likes_count"]),
+                "is_liked": members.get(post_id, post_id in liked),
+            }
+            for p, post_id in zip(posts, post_ids)
+        ]
+
+    async def get_likers(self, post_id: UUID, limit: int, cursor: str | None = None):
+        after = _decode_cursor(cursor, aware_datetime, UUID)
+        rows = await self.repo.get_likers(post_id=post_id, limit=limit, after=after)
+        return _likers_page(rows, limit)
+
+    async def get_likes_count(self, post_id: UUID) -> int:
+        # Buffered likes haven't reached the counter column yet.
+        count = await self.buffer.count("post", post_id) if self.buffer else None
+        if count is None:
+            count = await self.repo.get_likes_count(post_id=post_id)
+        if count is None:
+            raise PostNotFoundException()
+        return count
 
 
 class CommentLikeService:
-    def __init__(self, repo: CommentLikeRepository):
+    def __init__(
+        self,
+        repo: CommentLikeRepository,
+        buffer: LikeBuffer | None,
+        batcher: LikeBatcher | None,
+    ):
         self.repo = repo
+        self.buffer = buffer
+        self.batcher = batcher
 
     async def like_comment(self, comment_id: UUID, user_id: UUID):
-        data = {"comment_id": comment_id, "user_id": user_id}
-        try:
-            return await self.repo.create(new_data=data)
-        except UniqueConstraintError:
+        if self.buffer:
+            like = await self._buffered(self.buffer.like, comment_id, user_id)
+        elif self.batcher:
+            like = await self._batched(self.batcher.like, comment_id, user_id)
+        else:
+            try:
+                like = await self.repo.like_comment(
+                    comment_id=comment_id, user_id=user_id
+                )
+            except ForeignKeyConstraintError as e:
+                if e.constraint_name == "comment_likes_comment_id_fkey":
+                    raise CommentNotFoundException()
+                if e.constraint_name == "comment_likes_user_id_fkey":
+                    raise UserNotFoundException()
+                raise
+        if like is None:
             raise CommentLikeUniqueViolationException()
+        return like
+
+    async def unlike_comment(self, comment_id: UUID, user_id: UUID):
+        if self.buffer:
+            like = await self._buffered(self.buffer.unlike, comment_id, user_id)
+        elif self.batcher:
+            like = await self._batched(self.batcher.unlike, comment_id, user_id)
+        else:
+            result = await self.repo.unlike_comment(
+                comment_id=comment_id, user_id=user_id
+            )
+            like = result[0] if result else None
+        if not like:
+            raise CommentLikeNotFoundException()
+        return like
+
+    async def _buffered(self, change, comment_id: UUID, user_id: UUID):
+        try:
+            return await change(
+                "comment",
+                comment_id,
+                user_id,
+                lambda: self.repo.get_like_seed(comment_id=comment_id, user_id=user_id),
+            )
+        except LookupError:
+            raise CommentNotFoundException()
+
+    async def _batched(self, change, comment_id: UUID, user_id: UUID):
+        try:
+            return await change(comment_id, user_id)
+        except LookupError:
+            raise CommentNotFoundException()
         except ForeignKeyConstraintError as e:
             if e.constraint_name == "comment_likes_comment_id_fkey":
                 raise CommentNotFoundException()
             if e.constraint_name == "comment_likes_user_id_fkey":
                 raise UserNotFoundException()
+            raise
 
-    async def unlike_comment(self, comment_id: UUID, user_id: UUID):
-        result = await self.repo.delete_one_or_more(
-            comment_id=comment_id, user_id=user_id
+    async def get_likers(self, comment_id: UUID, limit: int, cursor: str | None = None):
+        after = _decode_cursor(cursor, aware_datetime, UUID)
+        rows = await self.repo.get_likers(
+            comment_id=comment_id, limit=limit, after=after
         )
-        if not result:
-            raise CommentLikeNotFoundException()
-        return result[0]
+        return _likers_page(rows, limit)
+
+    async def get_likes_count(self, comment_id: UUID) -> int:
+        count = await self.buffer.count("comment", comment_id) if self.buffer else None
+        if count is None:
+            count = await self.repo.get_likes_count(comment_id=comment_id)
+        if count is None:
+            raise CommentNotFoundException()
+        return count
@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import Any, Iterable
+from uuid import UUID
+
+from src.core.pagination import encode_cursor
+from src.users.utils import profile_image_path
+
+
+def build_comment_tree(rows: Iterable[Any], root_id: UUID) -> dict | None:
+    """Assemble the nested `CommentWithChildren` structure from flat rows in a
+    single pass, without building a Pydantic model per node.
+
+    Rows must list every parent before its children (the repository returns
+    them level by level) and siblings in (created_at, id) order. A row whose
+    parent was cut off by the node limit is dropped together with its subtree.
+    """
+    nodes: dict[UUID, dict] = {}
+    last_child: dict[UUID, tuple] = {}
+    # Authors and posts repeat across a thread: share their encoded forms.
+    authors: dict[UUID, dict] = {}
+    post_ids: dict[UUID, str] = {}
+    root = None
+
+    for row in rows:
+        author = authors.get(row.user_id)
+        if author is None:
+            author = authors[row.user_id] = {
+                "username": row.username,
+                "email": row.email,
+                "id": str(row.user_id),
+                "image_file": row.image_file,
+                "image_path": profile_image_path(row.image_file),
+            }
+        post_id = post_ids.get(row.post_id)
+        if post_id is None:
+            post_id = post_ids[row.post_id] = str(row.post_id)
+        parent = nodes.get(row.parent_id)
+        node = {
+            "id": str(row.id),
+            "user_id": author["id"],
+            "post_id": post_id,
+            "parent_id": parent["id"] if parent else None,
+            "content": row.content,
+            "created_at": _isoformat(row.created_at),
+            "updated_at": _isoformat(row.updated_at),
+            "author": author,
+            "likes_count": row.likes_count,
+            "replies_count": row.replies_count,
+            "children": [],
+            "has_more": False,
+            "next_cursor": None,
+        }
+        if row.id == root_id:
+            node["parent_id"] = str(row.parent_id) if row.parent_id else None
+            root = node
+        elif parent is None:
+            continue
+        else:
+            parent["children"].append(node)
+            last_child[row.parent_id] = (row.created_at, row.id)
+        nodes[row.id] = node
+
+    if root is None:
+        return None
+
+    for node_id, node in nodes.items():
+        if node["replies_count"] > len(node["children"]):
+            node["has_more"] = True
+            if node_id in last_child:
+                node["next_cursor"] = encode_cursor(*last_child[node_id])
+
+    return root
+
+
+def _isoformat(value: datetime) -> str:
+    # Same form Pydantic emits, so cached and uncached responses match.
+    text = value.isoformat()
+    if text.endswith("+00:00"):
+        return text[:-6] + "Z"
+    return text